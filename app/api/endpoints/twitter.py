@@ -1,15 +1,92 @@
-from fastapi import APIRouter, HTTPException, Query
-from app.services.twitter.manager import scrape_twitter_profile
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from app.services.twitter.manager import get_twitter_profile
+from app.services.twitter.normalize import AUTHOR_FIELDS
+from app.services.twitter.stats import get_stats_history
 from app.core.logger import setup_logger
+from app.core.serialization import dumps, ORJSONResponse
 from app.models.tweet import TwitterResponse
 
 router = APIRouter()
 logger = setup_logger("api.twitter")
 
-@router.get("/{username}", response_model=TwitterResponse, summary="抓取 Twitter 用户推文")
+# 每个 (用户名, limit, include_author) 最近一次的 ETag 及其首次出现的时间，用于 Last-Modified
+_validators = OrderedDict()
+_validators_lock = threading.Lock()
+_MAX_VALIDATORS = 4096
+
+def build_payload(data):
+    """
+    按 TwitterResponse 的结构组装响应。
+    数据在 manager 中已统一化为 Tweet / Author 的字段，这里不再经过 Pydantic 校验。
+    """
+    author = data.get("author") or {}
+    tweets = data.get("tweet", [])
+    return {
+        "author": {key: author.get(key) for key in AUTHOR_FIELDS},
+        "tweet": tweets,
+        "count": len(tweets),
+        "platform": "twitter"
+    }
+
+def encode_entry(entry):
+    """编码缓存条目并把结果挂在条目上，缓存命中时直接返回已编码的 bytes"""
+    if entry.body is None:
+        entry.body = dumps(build_payload(entry.value))
+    return entry.body
+
+def compute_etag(body):
+    """根据响应的已编码 bytes 计算强校验 ETag (任何字段变化都会改变 ETag)"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def validate_entry(entry, key):
+    """为缓存条目计算 ETag 与 Last-Modified (内容不变时 Last-Modified 保持不变)"""
+    if entry.etag is None:
+        etag = compute_etag(encode_entry(entry))
+        with _validators_lock:
+            previous = _validators.get(key)
+            if previous is not None and previous[0] == etag:
+                last_modified = previous[1]
+            else:
+                last_modified = entry.created_at
+                _validators[key] = (etag, last_modified)
+            _validators.move_to_end(key)
+            while len(_validators) > _MAX_VALIDATORS:
+                _validators.popitem(last=False)
+        entry.last_modified = last_modified
+        entry.etag = etag
+    return entry.etag, entry.last_modified
+
+def is_not_modified(request, etag, last_modified):
+    """按 RFC 9110 处理 If-None-Match / If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        # GET 请求使用弱比较，忽略 W/ 前缀
+        return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP 日期精度为秒
+        return int(last_modified) <= since
+    return False
+
+@router.get("/{username}", response_model=TwitterResponse, response_class=ORJSONResponse, summary="抓取 Twitter 用户推文")
 def get_twitter_tweets(
+    request: Request,
     username: str, 
-    limit: int = Query(10, ge=1, le=100, description="抓取推文数量限制 (1-100)")
+    limit: int = Query(10, ge=1, le=100, description="抓取推文数量限制 (1-100)"),
+    include_author: bool = Query(True, description="是否返回用户信息，不需要时跳过 profile 提取")
 ):
     """
     抓取指定 Twitter 用户的推文数据。
@@ -18,22 +95,47 @@ def get_twitter_tweets(
     
     - **username**: Twitter 用户名 (不带 @)
     - **limit**: 返回的推文数量限制
+    - **include_author**: 只需要推文时可以跳过用户信息的提取
+
+    支持 `If-None-Match` / `If-Modified-Since` 条件请求，内容未变化时返回 304。
     """
-    logger.info(f"API Request: Scrape Twitter user {username}, limit={limit}")
+    logger.info(f"API Request: Scrape Twitter user {username}, limit={limit}, include_author={include_author}")
     try:
-        # 使用统一的 manager 进行抓取，支持自动 fallback
-        data = scrape_twitter_profile(username, limit)
+        # 使用统一的 manager 进行抓取，支持自动 fallback、结果缓存与并发请求合并
+        entry = get_twitter_profile(username, limit, include_author)
+        data = entry.value
         
         # 如果返回空数据，或者没有找到推文
         if not data.get("tweet") and not data.get("author"):
              logger.warning(f"No data found for user {username}")
         
-        return {
-            "author": data.get("author", {}),
-            "tweet": data.get("tweet", []),
-            "count": len(data.get("tweet", [])),
-            "platform": "twitter"
+        etag, last_modified = validate_entry(entry, (username.lower(), limit, include_author))
+        ttl = entry.remaining_ttl
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(last_modified, usegmt=True),
+            "Cache-Control": f"public, max-age={ttl}" if ttl > 0 else "no-cache",
         }
+        if is_not_modified(request, etag, last_modified):
+            return Response(status_code=304, headers=headers)
+
+        # 直接返回已编码的响应，跳过 response_model 的校验与序列化
+        return ORJSONResponse(encode_entry(entry), headers=headers)
     except Exception as e:
         logger.error(f"Error scraping twitter user {username}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{username}/stats", summary="用户统计数据的历史记录")
+def get_twitter_stats(
+    username: str,
+    since: Optional[int] = Query(None, description="只返回该 Unix 时间戳之后的数据点")
+):
+    """
+    返回抓取过程中记录的帖子数、关注数、粉丝数、点赞数的时间序列 (不会触发抓取)。
+    """
+    points = get_stats_history().query(username, since)
+    return {
+        "username": username,
+        "points": points,
+        "count": len(points),
+    }
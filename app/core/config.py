@@ -1,6 +1,9 @@
-import yaml
 import os
-import logging
+import copy
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple
 
 # 默认配置，作为 fallback
 DEFAULT_CONFIG = {
@@ -28,26 +31,269 @@ DEFAULT_CONFIG = {
     }
 }
 
+KNOWN_SOURCES = ("nitter", "sotwe")
+KNOWN_MODES = ("sequential", "fanout")
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+class ConfigError(ValueError):
+    """配置文件无法解析或校验失败"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__("Invalid configuration:\n  - " + "\n  - ".join(self.errors))
+
+@dataclass(frozen=True)
+class BrowserSettings:
+    headless: bool
+    timeout: int
+    pool_size: int
+    prewarm: bool
+    startup_timeout: float
+    job_timeout: float
+    respawn_backoff: float
+
+@dataclass(frozen=True)
+class FanoutSettings:
+    quorum: Optional[int]
+    timeout: float
+
+@dataclass(frozen=True)
+class TwitterSettings:
+    sources: Tuple[str, ...]
+    mode: str
+    nitter_instances: Tuple[str, ...]
+    fanout: FanoutSettings
+    browser: BrowserSettings
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    加载时编译好的只读配置快照。
+    paths 为所有点分路径到值的索引，get 时无需逐级查找；
+    twitter / user_agents 为抓取热路径使用的类型化字段。
+    """
+    data: Mapping[str, Any]
+    paths: Mapping[str, Any]
+    twitter: TwitterSettings
+    user_agents: Tuple[str, ...]
+    path: Optional[str] = None
+    mtime: Optional[float] = None
+
+def _freeze(value):
+    """把 dict / list 转换为只读的 MappingProxyType / tuple"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _index_paths(data, prefix="", paths=None):
+    if paths is None:
+        paths = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        paths[path] = value
+        if isinstance(value, Mapping):
+            _index_paths(value, f"{path}.", paths)
+    return paths
+
+def _validate(paths):
+    """校验会影响抓取的配置项，返回错误列表"""
+    errors = []
+
+    def check(path, predicate, message):
+        if path in paths and paths[path] is not None and not predicate(paths[path]):
+            errors.append(f"{path}: {message} (got {paths[path]!r})")
+
+    def is_int(value):
+        return isinstance(value, int) and not isinstance(value, bool)
+
+    def is_number(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    def positive(v):
+        return is_number(v) and v > 0
+
+    def non_negative(v):
+        return is_number(v) and v >= 0
+
+    def at_least_one(v):
+        return is_int(v) and v >= 1
+
+    def is_port(v):
+        return is_int(v) and 0 < v < 65536
+
+    def is_bool(v):
+        return isinstance(v, bool)
+
+    def is_str(v):
+        return isinstance(v, str) and v != ""
+
+    # 各组件按 section.get(...) 读取的配置段必须是映射
+    for section in (
+        "log", "server", "server.dispatcher", "http", "scraper", "scraper.twitter",
+        "scraper.twitter.fanout", "scraper.twitter.health", "scraper.twitter.cache",
+        "scraper.twitter.author_cache", "scraper.twitter.stats_history", "scraper.twitter.media",
+        "scraper.twitter.archive", "scraper.twitter.challenge", "scraper.twitter.browser",
+        "scraper.twitter.browser.watchdog",
+    ):
+        check(section, lambda v: isinstance(v, Mapping), "must be a mapping")
+
+    check("log.level", lambda v: isinstance(v, str) and v.upper() in LOG_LEVELS, f"must be one of {', '.join(LOG_LEVELS)}")
+    check("log.file", is_str, "must be a file path")
+
+    check("server.host", is_str, "must be a host name")
+    check("server.port", is_port, "must be a port number")
+    check("server.reload", is_bool, "must be true or false")
+    check("server.workers", at_least_one, "must be an integer >= 1")
+    check("server.config_reload", is_bool, "must be true or false")
+    check("server.config_reload_interval", positive, "must be a positive number")
+    check("server.dispatcher.base_port", is_port, "must be a port number")
+    check("server.dispatcher.health_interval", positive, "must be a positive number")
+    check("server.dispatcher.max_failures", at_least_one, "must be an integer >= 1")
+    check("server.dispatcher.timeout", positive, "must be a positive number")
+    check("server.dispatcher.drain_timeout", non_negative, "must be a number >= 0")
+
+    check("http.timeout", positive, "must be a positive number")
+    check("http.max_connections", at_least_one, "must be an integer >= 1")
+    check("http.max_keepalive_connections", lambda v: is_int(v) and v >= 0, "must be an integer >= 0")
+
+    check("scraper.twitter.sources", lambda v: isinstance(v, tuple) and v and all(s in KNOWN_SOURCES for s in v),
+          f"must be a non-empty list of {', '.join(KNOWN_SOURCES)}")
+    check("scraper.twitter.mode", lambda v: v in KNOWN_MODES, f"must be one of {', '.join(KNOWN_MODES)}")
+    check("scraper.twitter.nitter_instances",
+          lambda v: isinstance(v, tuple) and all(isinstance(i, str) and i.startswith(("http://", "https://")) for i in v),
+          "must be a list of http(s) URLs")
+    check("scraper.twitter.fanout.quorum", at_least_one, "must be an integer >= 1")
+    check("scraper.twitter.fanout.timeout", positive, "must be a positive number")
+    check("scraper.twitter.health.timeout", positive, "must be a positive number")
+
+    check("scraper.twitter.cache.ttl", non_negative, "must be a number >= 0")
+    check("scraper.twitter.cache.max_entries", at_least_one, "must be an integer >= 1")
+    check("scraper.twitter.author_cache.ttl", non_negative, "must be a number >= 0")
+    check("scraper.twitter.author_cache.max_entries", at_least_one, "must be an integer >= 1")
+    check("scraper.twitter.stats_history.max_points", at_least_one, "must be an integer >= 1")
+    check("scraper.twitter.stats_history.max_users", at_least_one, "must be an integer >= 1")
+
+    check("scraper.twitter.media.enabled", is_bool, "must be true or false")
+    check("scraper.twitter.media.download", is_bool, "must be true or false")
+    check("scraper.twitter.media.dir", is_str, "must be a directory path")
+    check("scraper.twitter.media.concurrency", at_least_one, "must be an integer >= 1")
+    check("scraper.twitter.media.timeout", positive, "must be a positive number")
+    check("scraper.twitter.media.inline_wait", non_negative, "must be a number >= 0")
+    check("scraper.twitter.media.pending_ttl", non_negative, "must be a number >= 0")
+
+    check("scraper.twitter.archive.enabled", is_bool, "must be true or false")
+    check("scraper.twitter.archive.dir", is_str, "must be a directory path")
+    check("scraper.twitter.archive.segment_size", at_least_one, "must be an integer >= 1 (bytes)")
+
+    check("scraper.twitter.challenge.max_attempts", at_least_one, "must be an integer >= 1")
+    check("scraper.twitter.challenge.budget", positive, "must be a positive number")
+
+    check("scraper.twitter.browser.headless", is_bool, "must be true or false")
+    check("scraper.twitter.browser.timeout", lambda v: is_int(v) and v > 0, "must be a positive integer (ms)")
+    check("scraper.twitter.browser.pool_size", at_least_one, "must be an integer >= 1")
+    check("scraper.twitter.browser.prewarm", is_bool, "must be true or false")
+    check("scraper.twitter.browser.startup_timeout", positive, "must be a positive number")
+    check("scraper.twitter.browser.job_timeout", positive, "must be a positive number")
+    check("scraper.twitter.browser.respawn_backoff", positive, "must be a positive number")
+    check("scraper.twitter.browser.watchdog.enabled", is_bool, "must be true or false")
+    check("scraper.twitter.browser.watchdog.interval", positive, "must be a positive number")
+    # 阈值为 0 或 null 表示不限制
+    for limit in ("max_rss_mb", "max_renderer_rss_mb", "max_pages", "max_contexts", "max_jobs", "max_age"):
+        check(f"scraper.twitter.browser.watchdog.{limit}", non_negative, "must be a number >= 0")
+
+    check("scraper.user_agents", lambda v: isinstance(v, tuple) and all(isinstance(a, str) and a for a in v),
+          "must be a list of non-empty strings")
+    return errors
+
+def compile_config(raw, path=None, mtime=None):
+    """
+    将合并后的配置字典编译为 ConfigSnapshot。
+    校验失败时抛出 ConfigError，包含所有错误项。
+    """
+    data = _freeze(raw)
+    paths = _index_paths(data)
+
+    errors = _validate(paths)
+    if errors:
+        raise ConfigError(errors)
+
+    def value(key, default):
+        found = paths.get(key)
+        return default if found is None else found
+
+    twitter = TwitterSettings(
+        sources=tuple(value("scraper.twitter.sources", KNOWN_SOURCES)),
+        mode=value("scraper.twitter.mode", "sequential"),
+        nitter_instances=tuple(value("scraper.twitter.nitter_instances", ())),
+        fanout=FanoutSettings(
+            quorum=paths.get("scraper.twitter.fanout.quorum"),
+            timeout=value("scraper.twitter.fanout.timeout", 60),
+        ),
+        browser=BrowserSettings(
+            headless=value("scraper.twitter.browser.headless", True),
+            timeout=value("scraper.twitter.browser.timeout", 20000),
+            pool_size=value("scraper.twitter.browser.pool_size", 2),
+            prewarm=value("scraper.twitter.browser.prewarm", True),
+            startup_timeout=value("scraper.twitter.browser.startup_timeout", 60),
+            job_timeout=value("scraper.twitter.browser.job_timeout", 180),
+            respawn_backoff=value("scraper.twitter.browser.respawn_backoff", 5),
+        ),
+    )
+    return ConfigSnapshot(
+        data=data,
+        paths=MappingProxyType(paths),
+        twitter=twitter,
+        user_agents=tuple(value("scraper.user_agents", ())),
+        path=path,
+        mtime=mtime,
+    )
+
 class Config:
     _instance = None
-    _config_data = DEFAULT_CONFIG
+    _snapshot = None
+    _config_path = "config.yml"
+    _lock = threading.Lock()
+    _subscribers = []
+    _watcher = None
+    _watch_stop = None
 
     @classmethod
-    def load(cls, config_path="config.yml"):
-        """加载配置文件"""
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    file_config = yaml.safe_load(f)
-                    if file_config:
-                        # 简单的深度合并（这里仅做顶层合并，生产环境建议使用专门的合并库）
-                        # 这里我们假设 config.yml 结构是完整的，或者我们只覆盖顶层 key
-                        # 为了稳健，我们手动合并几个关键 section
-                        cls._merge_config(cls._config_data, file_config)
-            except Exception as e:
-                print(f"Error loading config file {config_path}: {e}")
-        else:
+    def _read(cls, config_path):
+        """读取配置文件并与默认配置合并，返回 (配置字典, mtime)"""
+        # yaml 延迟导入，不读取配置的进程无需承担解析开销
+        import yaml
+
+        data = copy.deepcopy(DEFAULT_CONFIG)
+        if not os.path.exists(config_path):
             print(f"Config file {config_path} not found, using defaults.")
+            return data, None
+
+        mtime = os.path.getmtime(config_path)
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                file_config = yaml.safe_load(f)
+        except (OSError, yaml.YAMLError) as e:
+            raise ConfigError([f"{config_path}: {e}"])
+
+        if file_config:
+            if not isinstance(file_config, dict):
+                raise ConfigError([f"{config_path}: top level must be a mapping"])
+            cls._merge_config(data, file_config)
+        return data, mtime
+
+    @classmethod
+    def load(cls, config_path="config.yml"):
+        """
+        加载并编译配置文件。
+        文件无法解析或校验失败时抛出 ConfigError，而不是等到抓取时才出错。
+        """
+        raw, mtime = cls._read(config_path)
+        snapshot = compile_config(raw, config_path, mtime)
+        cls._config_path = config_path
+        cls._snapshot = snapshot
+        return snapshot
 
     @classmethod
     def _merge_config(cls, default, override):
@@ -58,26 +304,101 @@ class Config:
             else:
                 default[key] = value
 
+    @classmethod
+    def snapshot(cls) -> ConfigSnapshot:
+        """当前生效的配置快照 (不可变，可以在请求内多次读取而保持一致)"""
+        snapshot = cls._snapshot
+        if snapshot is None:
+            snapshot = cls._ensure_loaded()
+        return snapshot
+
     @classmethod
     def get(cls, path=None, default=None):
         """
         获取配置项
         path: 点分隔的路径，例如 "server.port"
         """
+        snapshot = cls.snapshot()
         if path is None:
-            return cls._config_data
-        
-        keys = path.split('.')
-        value = cls._config_data
-        for key in keys:
-            if isinstance(value, dict) and key in value:
-                value = value[key]
-            else:
-                return default
-        return value
+            return snapshot.data
+        return snapshot.paths.get(path, default)
+
+    @classmethod
+    def _ensure_loaded(cls):
+        """首次读取配置时才加载配置文件 (而不是在 import 时)"""
+        with cls._lock:
+            if cls._snapshot is None:
+                cls.load(cls._config_path)
+            return cls._snapshot
+
+    @classmethod
+    def subscribe(cls, callback):
+        """注册配置变更回调 callback(old_snapshot, new_snapshot)"""
+        if callback not in cls._subscribers:
+            cls._subscribers.append(callback)
+
+    @classmethod
+    def reload(cls):
+        """
+        重新加载配置文件并原子替换快照。
+        新配置无效时保留旧快照并抛出 ConfigError。
+        """
+        with cls._lock:
+            old = cls._snapshot
+            new = cls.load(cls._config_path)
 
-# 初始化加载
-Config.load()
+        for callback in list(cls._subscribers):
+            try:
+                callback(old, new)
+            except Exception as e:
+                print(f"Config subscriber {callback!r} failed: {e}")
+        return new
+
+    @classmethod
+    def watch(cls, interval=2.0):
+        """启动后台线程，配置文件修改后自动热加载"""
+        if cls._watcher is not None:
+            return
+        cls._watch_stop = threading.Event()
+
+        def run():
+            from app.core.logger import setup_logger
+
+            logger = setup_logger(__name__)
+            while not cls._watch_stop.wait(interval):
+                path = cls._config_path
+                try:
+                    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+                except OSError:
+                    continue
+                if mtime == cls.snapshot().mtime:
+                    continue
+                try:
+                    cls.reload()
+                    logger.info(f"配置文件 {path} 已重新加载")
+                except ConfigError as e:
+                    # 保留旧配置，并避免对同一个无效版本重复报错
+                    logger.error(f"配置文件 {path} 无效，继续使用旧配置: {e}")
+                    with cls._lock:
+                        cls._snapshot = _with_mtime(cls._snapshot, mtime)
+
+        cls._watcher = threading.Thread(target=run, name="config-watcher", daemon=True)
+        cls._watcher.start()
+
+    @classmethod
+    def stop_watch(cls):
+        if cls._watcher is not None:
+            cls._watch_stop.set()
+            cls._watcher.join(5)
+            cls._watcher = None
+
+def _with_mtime(snapshot, mtime):
+    from dataclasses import replace
+
+    return replace(snapshot, mtime=mtime)
 
 def get_config(path=None, default=None):
     return Config.get(path, default)
+
+def get_settings() -> ConfigSnapshot:
+    return Config.snapshot()
@@ -0,0 +1,37 @@
+import threading
+from app.core.config import get_config
+from app.core.user_agent import get_random_user_agent
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_http_client():
+    """
+    获取进程内共享的 HTTP 客户端 (带连接池)。
+    httpx 延迟导入，只有真正需要发起 HTTP 请求的进程才会加载。
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import httpx
+
+                http_config = get_config("http", {}) or {}
+                _client = httpx.Client(
+                    timeout=http_config.get("timeout", 10),
+                    limits=httpx.Limits(
+                        max_connections=http_config.get("max_connections", 20),
+                        max_keepalive_connections=http_config.get("max_keepalive_connections", 10),
+                    ),
+                    headers={"User-Agent": get_random_user_agent()},
+                    follow_redirects=True,
+                )
+    return _client
+
+def close_http_client():
+    """关闭共享 HTTP 客户端"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
@@ -1,7 +1,12 @@
 import logging
 import sys
+import threading
 from app.core.config import get_config
 
+# 由 setup_logger 创建、且未显式指定 level 的 logger，log.level 热更新时统一调整
+_configured = set()
+_configured_lock = threading.Lock()
+
 def setup_logger(name=__name__, level=None):
     """
     配置日志记录器
@@ -13,6 +18,8 @@ def setup_logger(name=__name__, level=None):
     if level is None:
         level_str = get_config("log.level", "INFO").upper()
         level = getattr(logging, level_str, logging.INFO)
+        with _configured_lock:
+            _configured.add(name)
     
     logger.setLevel(level)
     
@@ -36,3 +43,11 @@ def setup_logger(name=__name__, level=None):
                 sys.stderr.write(f"Failed to setup log file {log_file}: {e}\n")
         
     return logger
+
+def set_log_level(level_str):
+    """调整所有跟随配置的 logger 的级别"""
+    level = getattr(logging, str(level_str).upper(), logging.INFO)
+    with _configured_lock:
+        names = list(_configured)
+    for name in names:
+        logging.getLogger(name).setLevel(level)
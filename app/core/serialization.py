@@ -0,0 +1,19 @@
+import orjson
+from fastapi.responses import Response
+
+def dumps(content) -> bytes:
+    """使用 orjson 编码为 JSON bytes"""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+class ORJSONResponse(Response):
+    """
+    使用 orjson 编码的 JSON 响应。
+    content 为 bytes 时视为已编码好的 JSON，直接原样返回。
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -1,5 +1,5 @@
 import random
-from app.core.config import get_config
+from app.core.config import get_settings
 
 def get_random_user_agent() -> str:
     """
@@ -18,11 +18,11 @@ def get_random_user_agent() -> str:
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4.1 Safari/605.1.15"
     ]
 
-    # 从配置获取
-    configured_agents = get_config("scraper.user_agents", [])
+    # 从当前配置快照获取 (热加载后立即生效)
+    configured_agents = get_settings().user_agents
     
     # 如果配置了且不为空，则使用配置的列表
-    if configured_agents and isinstance(configured_agents, list):
+    if configured_agents:
         return random.choice(configured_agents)
     
     # 否则使用默认列表
@@ -0,0 +1,317 @@
+import os
+import sys
+import time
+import bisect
+import asyncio
+import hashlib
+import subprocess
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
+from app.core.config import get_config, get_settings
+from app.core.logger import setup_logger
+
+logger = setup_logger("dispatcher")
+
+# 不应透传的逐跳 (hop-by-hop) 头
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "host", "content-length",
+}
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+class HashRing:
+    """
+    一致性哈希环。worker 上下线时只有落在该 worker 上的用户名会被重新分配，
+    其余用户名仍然路由到原来的 worker，缓存与 Cookie 保持有效。
+    """
+
+    def __init__(self, nodes=(), replicas=100):
+        self.replicas = replicas
+        self._keys = []
+        self._nodes = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        for i in range(self.replicas):
+            h = _hash(f"{node}#{i}")
+            self._nodes[h] = node
+            bisect.insort(self._keys, h)
+
+    def get(self, key):
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._nodes[self._keys[index]]
+
+    def walk(self, key):
+        """按环上顺序返回所有不同的节点 (用于故障转移)"""
+        if not self._keys:
+            return []
+        start = bisect.bisect(self._keys, _hash(key))
+        seen = []
+        for offset in range(len(self._keys)):
+            node = self._nodes[self._keys[(start + offset) % len(self._keys)]]
+            if node not in seen:
+                seen.append(node)
+        return seen
+
+class WorkerProcess:
+    """一个独立的 uvicorn 进程，拥有自己的浏览器池与缓存"""
+
+    def __init__(self, index, host, port):
+        self.index = index
+        self.host = host
+        self.port = port
+        self.process = None
+        self.healthy = False
+        self.ready = False
+        self.failures = 0
+        self.restarts = 0
+        self.in_flight = 0
+        self.last_check = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def name(self):
+        return f"worker-{self.index}"
+
+    def start(self):
+        env = dict(os.environ, SOCIAL_SCRAPER_WORKER_ID=str(self.index))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", self.host, "--port", str(self.port)],
+            env=env,
+        )
+        logger.info(f"启动 {self.name} (pid={self.process.pid}) 于 {self.url}")
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def terminate(self):
+        # uvicorn 收到 SIGTERM 后会完成正在处理的请求再退出，并触发 lifespan 关闭浏览器
+        if self.alive:
+            self.process.terminate()
+
+    def wait(self, timeout):
+        if self.process is None:
+            return
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            logger.warning(f"{self.name} 未在 {timeout}s 内退出，强制结束")
+            self.process.kill()
+
+    def status(self):
+        return {
+            "name": self.name,
+            "url": self.url,
+            "pid": self.process.pid if self.process else None,
+            "alive": self.alive,
+            "healthy": self.healthy,
+            "ready": self.ready,
+            "in_flight": self.in_flight,
+            "restarts": self.restarts,
+            "last_check": self.last_check,
+        }
+
+def routing_key(path):
+    """/twitter/{username} 按用户名 (不区分大小写) 路由，其它路径返回 None"""
+    parts = path.strip("/").split("/")
+    if len(parts) >= 2 and parts[0] == "twitter" and parts[1]:
+        return parts[1].lower()
+    return None
+
+def default_request_timeout():
+    """
+    转发超时的默认值：必须大于 worker 端最坏情况的抓取耗时
+    (sequential 模式下每个数据源都可能耗尽 browser.job_timeout)，否则慢请求会在分发器先超时。
+    """
+    settings = get_settings().twitter
+    return len(settings.sources) * settings.browser.job_timeout + 30
+
+class Dispatcher:
+    """
+    前置分发器：按用户名一致性哈希把请求转发到固定的 worker 进程，
+    定期检查 worker 健康状态，并在退出时等待进行中的请求完成 (graceful draining)。
+    """
+
+    def __init__(self, workers=2, host="127.0.0.1", base_port=8100):
+        dispatcher_config = get_config("server.dispatcher", {}) or {}
+        self.workers = [WorkerProcess(i, host, base_port + i) for i in range(workers)]
+        self.health_interval = dispatcher_config.get("health_interval", 5)
+        self.max_failures = dispatcher_config.get("max_failures", 3)
+        self.request_timeout = dispatcher_config.get("timeout") or default_request_timeout()
+        self.drain_timeout = dispatcher_config.get("drain_timeout", 60)
+        self.draining = False
+        self.ring = HashRing()
+        self._round_robin = 0
+        self._client = None
+        self._health_task = None
+
+    def _rebuild_ring(self):
+        healthy = [w.name for w in self.workers if w.healthy]
+        self.ring = HashRing(healthy)
+
+    def _worker(self, name):
+        return next(w for w in self.workers if w.name == name)
+
+    async def start(self):
+        import httpx
+
+        self._client = httpx.AsyncClient(timeout=self.request_timeout)
+        for worker in self.workers:
+            worker.start()
+            # 先假定所有 worker 可用，保证启动阶段的路由也是稳定的
+            worker.healthy = True
+        self._rebuild_ring()
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def _check(self, worker):
+        worker.last_check = time.time()
+        if not worker.alive:
+            worker.healthy = False
+            worker.ready = False
+            if not self.draining:
+                logger.warning(f"{worker.name} 进程已退出，重新启动")
+                worker.restarts += 1
+                worker.start()
+            return
+        try:
+            response = await self._client.get(f"{worker.url}/ready", timeout=5)
+            # 预热中的 worker (503) 依然可以处理请求，只是首个请求较慢
+            worker.healthy = True
+            worker.ready = response.status_code == 200
+            worker.failures = 0
+        except Exception:
+            worker.failures += 1
+            worker.ready = False
+            if worker.failures >= self.max_failures:
+                worker.healthy = False
+
+    async def _health_loop(self):
+        while True:
+            before = [w.healthy for w in self.workers]
+            await asyncio.gather(*(self._check(w) for w in self.workers))
+            if [w.healthy for w in self.workers] != before:
+                self._rebuild_ring()
+                logger.info(f"可用 worker: {[w.name for w in self.workers if w.healthy]}")
+            await asyncio.sleep(self.health_interval)
+
+    def candidates(self, key):
+        """返回候选 worker 列表，第一个为首选"""
+        if key is not None:
+            names = self.ring.walk(key)
+            if names:
+                return [self._worker(n) for n in names]
+        healthy = [w for w in self.workers if w.healthy] or [w for w in self.workers if w.alive]
+        if not healthy:
+            return []
+        self._round_robin = (self._round_robin + 1) % len(healthy)
+        return healthy[self._round_robin:] + healthy[:self._round_robin]
+
+    async def forward(self, request: Request):
+        import httpx
+
+        if self.draining:
+            return Response(status_code=503, content=b"draining", headers={"Retry-After": "5"})
+
+        workers = self.candidates(routing_key(request.url.path))
+        if not workers:
+            return Response(status_code=503, content=b"no worker available", headers={"Retry-After": "5"})
+
+        body = await request.body()
+        headers = [(k, v) for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS]
+
+        # 只有首选 worker 无法建立连接时才沿哈希环转移到下一个 worker；
+        # 读取超时说明 worker 已经在处理 (慢抓取)，转移只会让下一个 worker 从头再抓一次
+        for worker in workers[:2]:
+            worker.in_flight += 1
+            try:
+                upstream = await self._client.request(
+                    request.method,
+                    f"{worker.url}{request.url.path}",
+                    params=request.url.query,
+                    headers=headers,
+                    content=body,
+                )
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                logger.warning(f"连接 {worker.name} 失败: {e}")
+                worker.failures += 1
+                continue
+            except httpx.TimeoutException as e:
+                logger.warning(f"{worker.name} 处理请求超时 ({type(e).__name__})")
+                return Response(status_code=504, content=b"upstream worker timed out")
+            except httpx.TransportError as e:
+                logger.warning(f"转发到 {worker.name} 失败: {e}")
+                worker.failures += 1
+                return Response(status_code=502, content=b"upstream worker error")
+            finally:
+                worker.in_flight -= 1
+
+            response_headers = {
+                k: v for k, v in upstream.headers.items()
+                if k.lower() not in HOP_BY_HOP_HEADERS and k.lower() != "content-encoding"
+            }
+            response_headers["X-Worker"] = worker.name
+            return Response(content=upstream.content, status_code=upstream.status_code, headers=response_headers)
+
+        return Response(status_code=502, content=b"upstream worker unavailable")
+
+    async def drain(self):
+        """停止接收新请求，等待进行中的请求完成后关闭所有 worker"""
+        self.draining = True
+        logger.info("开始排空请求...")
+        deadline = time.monotonic() + self.drain_timeout
+        while sum(w.in_flight for w in self.workers) and time.monotonic() < deadline:
+            await asyncio.sleep(0.2)
+
+        if self._health_task is not None:
+            self._health_task.cancel()
+        for worker in self.workers:
+            worker.terminate()
+        await asyncio.gather(*(asyncio.to_thread(w.wait, self.drain_timeout) for w in self.workers))
+        if self._client is not None:
+            await self._client.aclose()
+        logger.info("所有 worker 已退出")
+
+    def status(self):
+        return {
+            "draining": self.draining,
+            "workers": [w.status() for w in self.workers],
+        }
+
+def create_dispatcher_app(workers=2, host="127.0.0.1", base_port=8100) -> FastAPI:
+    dispatcher = Dispatcher(workers, host, base_port)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await dispatcher.start()
+        yield
+        await dispatcher.drain()
+
+    app = FastAPI(title="SocialScraper Dispatcher", lifespan=lifespan, docs_url=None, redoc_url=None)
+    app.state.dispatcher = dispatcher
+
+    @app.get("/_dispatcher/workers")
+    def workers_status():
+        return dispatcher.status()
+
+    @app.get("/ready")
+    def ready(response: Response):
+        status = dispatcher.status()
+        status["ready"] = not dispatcher.draining and any(w["ready"] for w in status["workers"])
+        if not status["ready"]:
+            response.status_code = 503
+        return status
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"])
+    async def proxy(request: Request, path: str):
+        return await dispatcher.forward(request)
+
+    return app
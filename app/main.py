@@ -1,14 +1,45 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from app.api.api import api_router
+from app.core.config import Config, get_config
 from app.core.logger import setup_logger
+from app.core.serialization import ORJSONResponse
+from app.services.twitter import runtime
+from app.services.twitter.browser import get_browser_pool
+from app.services.twitter.challenge import get_challenge_stats
+from app.services.twitter.watchdog import get_browser_watchdog
 
 logger = setup_logger("app")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 在后台预热浏览器等资源，服务可以立即接受请求，/ready 在预热完成前返回 503
+    prewarm_task = None
+    if get_config("scraper.twitter.browser.prewarm", True):
+        prewarm_task = asyncio.create_task(asyncio.to_thread(runtime.prewarm))
+
+    # 监控浏览器内存与上下文/页面数量，超过阈值时自动回收
+    if get_config("scraper.twitter.browser.watchdog.enabled", True):
+        get_browser_watchdog().start()
+
+    # 配置文件修改后自动热加载，并应用到运行中的浏览器池与缓存
+    if get_config("server.config_reload", True):
+        Config.subscribe(runtime.apply_config)
+        Config.watch(get_config("server.config_reload_interval", 2))
+    yield
+    Config.stop_watch()
+    if prewarm_task is not None and not prewarm_task.done():
+        await asyncio.wait([prewarm_task], timeout=5)
+    await asyncio.to_thread(runtime.shutdown)
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title="SocialScraper API",
         description="API for scraping social media data",
-        version="1.0.0"
+        version="1.0.0",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan
     )
 
     app.include_router(api_router)
@@ -16,7 +47,22 @@ def create_app() -> FastAPI:
     @app.get("/")
     def read_root():
         return {"message": "Welcome to SocialScraper API. Visit /docs for documentation."}
-    
+
+    @app.get("/ready", summary="就绪检查")
+    def ready(response: Response):
+        status = runtime.readiness()
+        if not status["ready"]:
+            response.status_code = 503
+        return status
+
+    @app.get("/diagnostics", summary="运行时诊断信息")
+    def diagnostics():
+        return {
+            "challenges": get_challenge_stats(),
+            "browser_pool": get_browser_pool().stats(),
+            "browser_watchdog": get_browser_watchdog().stats(),
+        }
+
     return app
 
 app = create_app()
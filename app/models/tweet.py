@@ -1,6 +1,13 @@
 from pydantic import BaseModel
 from typing import List, Optional, Dict
 
+class Media(BaseModel):
+    url: str
+    sha256: str
+    path: str
+    content_type: Optional[str] = None
+    size: Optional[int] = None
+
 class Tweet(BaseModel):
     id: Optional[str] = None
     url: Optional[str] = None
@@ -8,6 +15,7 @@ class Tweet(BaseModel):
     published_at: Optional[str] = None
     author: Optional[str] = None
     media_urls: List[str] = []
+    media: List[Media] = []
 
 class Author(BaseModel):
     name: Optional[str] = None
@@ -0,0 +1,169 @@
+import os
+import json
+import zlib
+import glob
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from app.core.config import get_config
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# 记录格式: 4 字节大端长度 + zlib 压缩的 JSON
+_HEADER = struct.Struct(">I")
+SEGMENT_PATTERN = "segment-*.arc"
+
+class ArchiveWriter:
+    """
+    只追加的分段归档。每个段文件超过 segment_size 后切换到下一个段，
+    已写完的段不再修改，可以安全地被离线重解析读取。
+    """
+
+    def __init__(self, root, segment_size=64 * 1024 * 1024, level=6):
+        self.root = root
+        self.segment_size = segment_size
+        self.level = level
+        self._lock = threading.Lock()
+        self._file = None
+        os.makedirs(root, exist_ok=True)
+
+        segments = glob.glob(os.path.join(root, SEGMENT_PATTERN))
+        self._index = max(map(_segment_index, segments)) if segments else 0
+
+    def _segment_path(self, index):
+        return os.path.join(self.root, f"segment-{index:06d}.arc")
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self._segment_path(self._index), "ab")
+        elif self._file.tell() >= self.segment_size:
+            self._file.close()
+            self._index += 1
+            self._file = open(self._segment_path(self._index), "ab")
+        return self._file
+
+    def append(self, record):
+        payload = zlib.compress(json.dumps(record, ensure_ascii=False).encode("utf-8"), self.level)
+        with self._lock:
+            f = self._open()
+            f.write(_HEADER.pack(len(payload)) + payload)
+            f.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def _segment_index(path):
+    return int(os.path.basename(path)[len("segment-"):-len(".arc")])
+
+def list_segments(root):
+    """列出归档目录 (含各 worker 子目录) 下的所有段文件"""
+    paths = glob.glob(os.path.join(root, "**", SEGMENT_PATTERN), recursive=True)
+    return sorted(paths, key=lambda p: (os.path.dirname(p), _segment_index(p)))
+
+def iter_segment(path):
+    """逐条读取一个段文件；末尾不完整的记录 (写入中断) 会被跳过"""
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            (length,) = _HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                logger.warning(f"段文件 {path} 末尾记录不完整，已跳过")
+                return
+            yield json.loads(zlib.decompress(payload))
+
+def iter_archive(root):
+    for path in list_segments(root):
+        yield from iter_segment(path)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_archive_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                archive_config = get_config("scraper.twitter.archive", {}) or {}
+                root = archive_config.get("dir", "archive")
+                # 多进程模式下每个 worker 写入各自的子目录，避免并发追加同一个文件
+                worker_id = os.environ.get("SOCIAL_SCRAPER_WORKER_ID")
+                if worker_id is not None:
+                    root = os.path.join(root, f"worker-{worker_id}")
+                _writer = ArchiveWriter(
+                    root,
+                    segment_size=archive_config.get("segment_size", 64 * 1024 * 1024),
+                )
+    return _writer
+
+def close_archive_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+def capture_page(source, instance, url, username, html):
+    """在开启 scraper.twitter.archive.enabled 时保存抓取到的页面 HTML"""
+    if not get_config("scraper.twitter.archive.enabled", False):
+        return
+    try:
+        get_archive_writer().append({
+            "source": source,
+            "instance": instance,
+            "url": url,
+            "username": username,
+            "fetched_at": time.time(),
+            "html": html,
+        })
+    except Exception as e:
+        # 归档失败不影响抓取本身
+        logger.warning(f"页面归档失败 ({url}): {e}")
+
+def extract_record(record):
+    """用与在线抓取相同的提取器解析一条归档记录，返回统一化后的结果"""
+    from app.services.twitter.extractors import extract_nitter, extract_sotwe
+    from app.services.twitter.normalize import normalize_result
+
+    source = record.get("source")
+    if source == "nitter":
+        data = extract_nitter(record["html"], record.get("instance") or "")
+    elif source == "sotwe":
+        data = extract_sotwe(record["html"], record.get("username") or "")
+    else:
+        raise ValueError(f"Unknown source: {source}")
+    return normalize_result(data)
+
+def reparse_segment(path):
+    """在子进程中重解析一个段文件，返回结果列表"""
+    results = []
+    for record in iter_segment(path):
+        meta = {key: record.get(key) for key in ("source", "instance", "url", "username", "fetched_at")}
+        try:
+            meta.update(extract_record(record))
+        except Exception as e:
+            meta["error"] = str(e)
+        results.append(meta)
+    return results
+
+def reparse_archive(root, workers=None):
+    """
+    使用进程池离线重解析整个归档 (不需要网络与浏览器)。
+    以段文件为单位分发给子进程，按段顺序逐个产出结果。
+    """
+    segments = list_segments(root)
+    if not segments:
+        logger.warning(f"归档目录 {root} 中没有段文件")
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for path, results in zip(segments, executor.map(reparse_segment, segments)):
+            logger.info(f"重解析完成 {os.path.basename(path)}: {len(results)} 条记录")
+            yield from results
@@ -0,0 +1,462 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from app.core.config import get_settings
+from app.core.logger import setup_logger
+from app.core.user_agent import get_random_user_agent
+
+logger = setup_logger(__name__)
+
+# 所有抓取共用的上下文参数 (User-Agent 在创建时随机选取)
+CONTEXT_OPTIONS = {
+    "viewport": {"width": 1920, "height": 1080},
+    "locale": "en-US",
+    "timezone_id": "America/New_York",
+}
+
+class BrowserWorker:
+    """
+    持有一个 Chromium 实例的工作线程。
+
+    Playwright 同步 API 的对象只能在创建它的线程中使用，
+    因此浏览器的启动、上下文创建和抓取任务都在该线程内执行。
+    每个 worker 会预先准备一个已应用 stealth 的空闲上下文，下一次抓取直接取用。
+    """
+
+    def __init__(self, index, jobs, headless=True, on_ready=None, on_failure=None):
+        self.index = index
+        self.headless = headless
+        self.ready = threading.Event()
+        self.error = None
+        self.retry_at = 0
+        self.jobs_done = 0
+        self._on_ready = on_ready
+        self._on_failure = on_failure
+        # 资源统计，由 watchdog 在其他线程中读取
+        self.pid = None
+        self.connected = False
+        self.started_at = None
+        self.open_pages = 0
+        self.leaked_contexts = 0
+        self._contexts = set()
+        self._jobs = jobs
+        self._browser = None
+        self._stealth = None
+        self._spare = None
+        self._retire = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"browser-worker-{index}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    @property
+    def alive(self):
+        return self._thread.is_alive()
+
+    @property
+    def open_contexts(self):
+        return len(self._contexts)
+
+    @property
+    def retiring(self):
+        return self._retire.is_set()
+
+    def retire(self):
+        """让 worker 在当前任务完成后退出并关闭浏览器 (不影响正在执行的抓取)"""
+        self._retire.set()
+
+    def _discover_pid(self):
+        """通过 CDP 获取 Chromium 主进程 PID，供 watchdog 统计内存；失败时返回 None"""
+        try:
+            session = self._browser.new_browser_cdp_session()
+            try:
+                info = session.send("SystemInfo.getProcessInfo")
+            finally:
+                session.detach()
+            for process in info.get("processInfo", []):
+                if process.get("type") == "browser":
+                    return process.get("id")
+        except Exception as e:
+            logger.debug(f"Browser worker {self.index} 无法获取浏览器进程 PID: {e}")
+        return None
+
+    def _run(self):
+        try:
+            # Playwright 与 stealth 脚本延迟到浏览器线程内导入 (未安装时同样按启动失败处理)
+            from playwright.sync_api import sync_playwright
+            from playwright_stealth import Stealth
+
+            with sync_playwright() as p:
+                # 增加 args 模拟真实浏览器特征，绕过部分简单检测
+                self._browser = p.chromium.launch(
+                    headless=self.headless,
+                    args=['--disable-blink-features=AutomationControlled']
+                )
+                self.connected = True
+                self._browser.on("disconnected", self._on_disconnected)
+                self._stealth = Stealth()
+                self.pid = self._discover_pid()
+                self._spare = self._new_context()
+                self.started_at = time.monotonic()
+                logger.info(f"Browser worker {self.index} 已就绪")
+                self.ready.set()
+                if self._on_ready is not None:
+                    self._on_ready(self)
+
+                self._serve()
+                if not self.connected:
+                    # 浏览器崩溃 (例如被 OOM killer 结束)，按运行失败处理，由浏览器池重新启动
+                    raise RuntimeError("浏览器连接已断开")
+
+                for context in list(self._contexts):
+                    self._close_context(context)
+                self._browser.close()
+                logger.info(f"Browser worker {self.index} 已退出 (共处理 {self.jobs_done} 个任务)")
+        except Exception as e:
+            logger.error(f"Browser worker {self.index} 启动或运行失败: {e}")
+            self.error = e
+            self.ready.set()
+            if self._on_failure is not None:
+                self._on_failure(self)
+
+    def _on_disconnected(self, _browser):
+        self.connected = False
+        logger.warning(f"Browser worker {self.index} 的浏览器连接已断开")
+
+    def _serve(self):
+        # 浏览器断开后不再取任务，队列中的任务留给其他 worker
+        while not self._retire.is_set() and self.connected:
+            try:
+                # 定时醒来检查 retire 标记；任务只在取出后才属于本 worker，不会丢失
+                job = self._jobs.get(timeout=1)
+            except queue.Empty:
+                continue
+            if job is None:
+                break
+
+            # 空闲期间 Playwright 不会派发 disconnected 事件，执行任务前先与浏览器往返一次确认存活；
+            # 浏览器已断开时把任务放回队列，由其他 worker 执行，本 worker 按运行失败退出
+            if not self._probe():
+                self._jobs.put(job)
+                break
+
+            fn, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(self))
+            except BaseException as e:
+                future.set_exception(e)
+            self.jobs_done += 1
+
+            # 任务之间不应有除空闲上下文以外的上下文，剩下的都是未归还的泄漏上下文
+            self._close_leaked_contexts()
+
+            # 在返回结果之后补充空闲上下文，不占用请求耗时 (即将退出的 worker 不再补充)
+            if self._spare is None and not self._retire.is_set():
+                try:
+                    self._spare = self._new_context()
+                except Exception as e:
+                    logger.warning(f"Browser worker {self.index} 预建上下文失败: {e}")
+
+    def _probe(self):
+        """与浏览器进行一次轻量的往返调用 (读取空闲上下文的 cookies)，失败时标记连接已断开"""
+        try:
+            if self._spare is None:
+                self._spare = self._new_context()
+            else:
+                self._spare.cookies()
+        except Exception as e:
+            logger.warning(f"Browser worker {self.index} 存活检查失败: {e}")
+            self.connected = False
+        if not self._browser.is_connected():
+            self.connected = False
+        return self.connected
+
+    def _new_context(self):
+        user_agent = get_random_user_agent()
+        context = self._browser.new_context(user_agent=user_agent, **CONTEXT_OPTIONS)
+        self._contexts.add(context)
+        context.on("page", self._on_page)
+        # 应用 stealth 模式以隐藏自动化特征
+        self._stealth.apply_stealth_sync(context)
+        return context, user_agent
+
+    def _on_page(self, page):
+        self.open_pages += 1
+
+        def on_close(_):
+            self.open_pages -= 1
+
+        page.on("close", on_close)
+
+    def _close_context(self, context):
+        if context is None:
+            return
+        self._contexts.discard(context)
+        try:
+            context.close()
+        except Exception:
+            pass
+
+    def _close_leaked_contexts(self):
+        spare = self._spare[0] if self._spare is not None else None
+        leaked = [c for c in self._contexts if c is not spare]
+        if leaked:
+            logger.warning(f"Browser worker {self.index} 回收了 {len(leaked)} 个未关闭的上下文")
+            self.leaked_contexts += len(leaked)
+            for context in leaked:
+                self._close_context(context)
+
+    def acquire_context(self):
+        """获取一个已应用 stealth 的浏览器上下文 (仅能在 worker 线程中调用)"""
+        spare, self._spare = self._spare, None
+        context, user_agent = spare if spare is not None else self._new_context()
+        logger.info(f"Using User-Agent: {user_agent}")
+        return context
+
+    def release_context(self, context):
+        """归还上下文。上下文会带有 Cookie 等状态，因此直接关闭而不复用"""
+        self._close_context(context)
+
+def _is_live(worker):
+    return worker.ready.is_set() and worker.error is None and worker.connected
+
+class BrowserPool:
+    """
+    浏览器池：N 个 BrowserWorker 共享一个任务队列。
+    """
+
+    def __init__(self, size=2, headless=True, respawn_backoff=5, max_backoff=300):
+        self.size = max(1, size)
+        self.headless = headless
+        self.respawn_backoff = respawn_backoff
+        self.max_backoff = max_backoff
+        self._failures = 0
+        self._jobs = queue.Queue()
+        self._workers = []
+        self._retiring = []
+        self._next_index = 0
+        self.recycled = 0
+        self._lock = threading.Lock()
+        self._started = False
+
+    def _spawn(self):
+        worker = BrowserWorker(
+            self._next_index, self._jobs, self.headless,
+            on_ready=self._worker_ready, on_failure=self._worker_failed,
+        )
+        self._next_index += 1
+        worker.start()
+        return worker
+
+    def start(self, wait=True, timeout=None):
+        """启动全部 worker；wait=True 时阻塞到浏览器全部启动完成"""
+        with self._lock:
+            if not self._started:
+                self._workers = [self._spawn() for _ in range(self.size)]
+                self._started = True
+
+        if wait:
+            for worker in self._workers:
+                worker.ready.wait(timeout)
+        return self
+
+    def submit(self, fn):
+        """
+        提交一个抓取任务，fn(worker) 会在某个浏览器线程中执行。
+        返回 concurrent.futures.Future。
+        """
+        if not self._started:
+            self.start(wait=False)
+        if not any(w.error is None for w in self._workers):
+            raise RuntimeError("没有可用的浏览器 worker")
+
+        future = Future()
+        self._jobs.put((fn, future))
+        return future
+
+    def run(self, fn, timeout=None):
+        future = self.submit(fn)
+        try:
+            return future.result(timeout)
+        except FuturesTimeoutError:
+            # 仍在排队的任务直接取消；已经开始执行的任务无法中断，其结果会被丢弃
+            future.cancel()
+            raise TimeoutError(f"浏览器任务超过 {timeout}s 未完成") from None
+
+    def _fail_pending(self, exc):
+        """让队列中所有尚未开始的任务以 exc 失败 (保留队列中的退出信号)"""
+        sentinels = 0
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                sentinels += 1
+                continue
+            _, future = job
+            if future.set_running_or_notify_cancel():
+                future.set_exception(exc)
+        for _ in range(sentinels):
+            self._jobs.put(None)
+
+    def _worker_ready(self, worker):
+        with self._lock:
+            self._failures = 0
+
+    def _worker_failed(self, worker):
+        """
+        worker 启动或运行失败 (在 worker 线程中调用)。
+        已经没有可用 worker 时让排队的任务立即失败，而不是无限等待；
+        失败的 worker 按指数退避重新启动。
+        """
+        with self._lock:
+            if not self._started or worker not in self._workers:
+                return
+            self._failures += 1
+            delay = min(self.respawn_backoff * 2 ** (self._failures - 1), self.max_backoff)
+            worker.retry_at = time.monotonic() + delay
+            if not any(w.error is None for w in self._workers):
+                self._fail_pending(RuntimeError(f"没有可用的浏览器 worker: {worker.error}"))
+
+        logger.warning(f"Browser worker {worker.index} 将在 {delay:.0f}s 后重新启动")
+        timer = threading.Timer(delay, self._replace_failed, args=(worker,))
+        timer.daemon = True
+        timer.start()
+
+    def _replace_failed(self, worker):
+        with self._lock:
+            if not self._started or worker not in self._workers or worker.error is None:
+                return False
+            self._workers[self._workers.index(worker)] = self._spawn()
+        logger.info(f"Browser worker {worker.index} 启动失败，已替换为新的 worker")
+        return True
+
+    def respawn(self, worker):
+        """替换一个失败的 worker；退避时间未到时不处理"""
+        if time.monotonic() < worker.retry_at:
+            return False
+        return self._replace_failed(worker)
+
+    def workers(self):
+        """当前在服务的 worker 列表 (不含正在退出的)"""
+        with self._lock:
+            return list(self._workers)
+
+    def recycle(self, worker, reason=None):
+        """
+        用新的浏览器替换一个 worker。新 worker 立即启动，
+        旧 worker 完成正在执行的抓取后再关闭浏览器，因此不会让进行中的请求失败。
+        """
+        with self._lock:
+            if worker not in self._workers:
+                return False
+            self._workers[self._workers.index(worker)] = self._spawn()
+            worker.retire()
+            self._retiring = [w for w in self._retiring if w.alive] + [worker]
+            self.recycled += 1
+        logger.info(f"Browser worker {worker.index} 已标记回收: {reason or 'manual'}")
+        return True
+
+    def resize(self, size):
+        """
+        调整 worker 数量。多出的 worker 在当前任务完成后退出，
+        队列中的任务由剩余 worker 继续处理。
+        """
+        size = max(1, size)
+        with self._lock:
+            self.size = size
+            if not self._started:
+                return
+            self._retiring = [w for w in self._retiring if w.alive]
+            while len(self._workers) > size:
+                worker = self._workers.pop()
+                worker.retire()
+                self._retiring.append(worker)
+            while len(self._workers) < size:
+                self._workers.append(self._spawn())
+        logger.info(f"浏览器池大小调整为 {size}")
+
+    def restart(self, headless=None):
+        """用新的浏览器替换全部 worker (例如 headless 配置变化后)，旧 worker 完成当前任务后退出"""
+        with self._lock:
+            if headless is not None:
+                self.headless = headless
+            if not self._started:
+                return
+            for worker in self._workers:
+                worker.retire()
+            self._retiring = [w for w in self._retiring if w.alive] + self._workers
+            self._workers = [self._spawn() for _ in range(self.size)]
+        logger.info("浏览器池已重启")
+
+    @property
+    def ready(self):
+        return self._started and all(_is_live(w) for w in self._workers)
+
+    @property
+    def live_workers(self):
+        """当前可以处理任务的 worker 数量 (已启动、未失败且浏览器仍然连接)"""
+        return sum(1 for w in self._workers if _is_live(w))
+
+    @property
+    def available(self):
+        """是否还有可用或正在启动的 worker (未启动的浏览器池按需启动，同样视为可用)"""
+        return not self._started or any(w.error is None and (not w.ready.is_set() or w.connected) for w in self._workers)
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "started": self._started,
+            "ready_workers": self.live_workers,
+            "failed_workers": sum(1 for w in self._workers if w.error is not None),
+            "queued_jobs": self._jobs.qsize(),
+            "jobs_done": sum(w.jobs_done for w in self._workers),
+            "retiring_workers": sum(1 for w in self._retiring if w.alive),
+            "recycled_workers": self.recycled,
+        }
+
+    def close(self, timeout=30):
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+            workers, self._workers = self._workers + self._retiring, []
+            self._retiring = []
+            self._fail_pending(RuntimeError("浏览器池已关闭"))
+            for _ in workers:
+                self._jobs.put(None)
+
+        # 在锁外等待 worker 退出，避免与 worker 线程中的失败回调互相等待
+        for worker in workers:
+            worker.join(timeout)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_browser_pool():
+    """获取进程内共享的浏览器池 (首次调用时创建，不会自动启动浏览器)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                browser_settings = get_settings().twitter.browser
+                _pool = BrowserPool(
+                    size=browser_settings.pool_size,
+                    headless=browser_settings.headless,
+                    respawn_backoff=browser_settings.respawn_backoff,
+                )
+    return _pool
+
+def close_browser_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -0,0 +1,114 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+class CacheEntry:
+    """
+    缓存条目，value 为抓取结果 (dict)。
+    body / etag / last_modified 由 API 层在首次响应时填充。
+    """
+
+    __slots__ = ("value", "body", "etag", "last_modified", "created_at", "expires_at")
+
+    def __init__(self, value, ttl):
+        self.value = value
+        self.body = None
+        self.etag = None
+        self.last_modified = None
+        self.created_at = time.time()
+        self.expires_at = self.created_at + ttl
+
+    @property
+    def expired(self):
+        return time.time() >= self.expires_at
+
+    @property
+    def remaining_ttl(self):
+        return max(0, int(self.expires_at - time.time()))
+
+class ResultCache:
+    """
+    进程内的 TTL + LRU 结果缓存，并合并相同 key 的并发请求 (in-flight coalescing)：
+    同一时刻对同一个 key 只会执行一次 loader，其余请求等待同一个结果。
+    """
+
+    def __init__(self, ttl=60, max_entries=512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expired:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, ttl=None):
+        entry = CacheEntry(value, self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_or_load(self, key, loader, cacheable=None, ttl=None):
+        """
+        获取缓存条目，不存在时调用 loader() 加载。
+        cacheable(value) 返回 False 时结果不会写入缓存 (例如全部数据源失败)。
+        ttl(value) 可以为单个结果指定 TTL，返回 None 时使用默认 TTL。
+        """
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            self.coalesced += 1
+            return future.result()
+
+        self.misses += 1
+        try:
+            value = loader()
+            if cacheable is None or cacheable(value):
+                entry = self.set(key, value, ttl(value) if ttl is not None else None)
+            else:
+                entry = CacheEntry(value, 0)
+            future.set_result(entry)
+            return entry
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+            inflight = len(self._inflight)
+        return {
+            "size": size,
+            "inflight": inflight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,208 @@
+import time
+import random
+import threading
+from app.core.config import get_config
+from app.core.logger import setup_logger
+from app.services.twitter.utils import human_click, wait_for_selector
+
+logger = setup_logger(__name__)
+
+CLOUDFLARE = "cloudflare"
+DDOS_GUARD = "ddos-guard"
+RATE_LIMITED = "rate-limited"
+
+# 验证页面常见标题 (小写比较)
+CHALLENGE_TITLES = {
+    "just a moment": CLOUDFLARE,
+    "attention required": CLOUDFLARE,
+    "verifying your browser": DDOS_GUARD,
+    "ddos-guard": DDOS_GUARD,
+    # lightbrd.com 的验证页面标题就是域名本身
+    "lightbrd.com": CLOUDFLARE,
+}
+
+# 在页面及所有 Shadow Root 中查找验证框，返回其位置 (一次 evaluate 完成)
+JS_FIND_BOX = """
+() => {
+    function findBox(root) {
+        const checkbox = root.querySelector('input[type="checkbox"]');
+        if (checkbox) return checkbox.getBoundingClientRect().toJSON();
+
+        const challenge = root.querySelector('.ctp-checkbox-label') || root.querySelector('#challenge-stage');
+        if (challenge) return challenge.getBoundingClientRect().toJSON();
+
+        const walker = document.createTreeWalker(root, NodeFilter.SHOW_ELEMENT);
+        for (let el = walker.nextNode(); el; el = walker.nextNode()) {
+            if (el.shadowRoot) {
+                const res = findBox(el.shadowRoot);
+                if (res) return res;
+            }
+        }
+        return null;
+    }
+    return findBox(document);
+}
+"""
+
+def classify(status=None, headers=None, title=None):
+    """
+    仅根据状态码、响应头和页面标题判断页面类型，不读取整个 DOM。
+    返回 CLOUDFLARE / DDOS_GUARD / RATE_LIMITED，不是验证页面时返回 None。
+    """
+    headers = headers or {}
+    if headers.get("cf-mitigated") == "challenge":
+        return CLOUDFLARE
+    if status == 429:
+        return RATE_LIMITED
+
+    server = headers.get("server", "").lower()
+    if status in (403, 503):
+        if "cloudflare" in server:
+            return CLOUDFLARE
+        if "ddos-guard" in server:
+            return DDOS_GUARD
+
+    if title:
+        lowered = title.lower()
+        for marker, kind in CHALLENGE_TITLES.items():
+            if marker in lowered:
+                return kind
+    return None
+
+def classify_page(page, response=None):
+    """对已加载的页面进行分类 (headers 来自导航响应，标题只需一次轻量调用)"""
+    status = response.status if response else None
+    headers = response.headers if response else None
+    return classify(status, headers, page.title())
+
+class ChallengeMetrics:
+    """按实例统计验证页面的出现次数、处理结果与耗时"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, instance, kind, outcome, elapsed):
+        with self._lock:
+            stats = self._stats.setdefault(instance, {
+                "detected": 0,
+                "solved": 0,
+                "failed": 0,
+                "skipped": 0,
+                "seconds": 0.0,
+                "kinds": {},
+            })
+            stats["detected"] += 1
+            stats[outcome] += 1
+            stats["seconds"] += elapsed
+            stats["kinds"][kind] = stats["kinds"].get(kind, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for instance, stats in self._stats.items():
+                item = dict(stats, kinds=dict(stats["kinds"]))
+                item["seconds"] = round(item["seconds"], 3)
+                item["solve_rate"] = round(stats["solved"] / stats["detected"], 3) if stats["detected"] else 0.0
+                result[instance] = item
+            return result
+
+metrics = ChallengeMetrics()
+
+def get_challenge_stats():
+    return metrics.snapshot()
+
+class ChallengeSolver:
+    """
+    验证页面处理器：在有限的尝试次数与时间预算内寻找验证框并模拟点击。
+    所有等待都通过 page.wait_for_timeout 完成，不使用 time.sleep 阻塞线程。
+    """
+
+    def __init__(self, max_attempts=None, budget=None):
+        challenge_config = get_config("scraper.twitter.challenge", {}) or {}
+        self.max_attempts = max_attempts or challenge_config.get("max_attempts", 3)
+        self.budget = budget or challenge_config.get("budget", 20)
+
+    def _remaining_ms(self, deadline):
+        return max(0, int((deadline - time.monotonic()) * 1000))
+
+    def _click_frame(self, page):
+        """在验证 iframe 中寻找 checkbox；找不到时点击 iframe 中心"""
+        for frame in page.frames:
+            if not any(marker in frame.url for marker in ("cloudflare", "challenge", "turnstile")):
+                continue
+            logger.info(f"发现验证 iframe: {frame.url}")
+
+            box = frame.query_selector("input[type='checkbox']") or frame.query_selector(".ctp-checkbox-label")
+            target = box.bounding_box() if box else None
+            if target is None:
+                # Turnstile 有时整个 iframe 就是点击区域
+                frame_elem = frame.frame_element()
+                target = frame_elem.bounding_box() if frame_elem else None
+            if target:
+                human_click(page, target["x"] + target["width"] / 2, target["y"] + target["height"] / 2)
+                return True
+        return False
+
+    def _click_shadow(self, page):
+        """穿透 Shadow DOM 查找验证框 (新版 Turnstile 常见)"""
+        box_rect = page.evaluate(JS_FIND_BOX)
+        if box_rect:
+            logger.info(f"通过 JS 在 Shadow DOM 中找到验证框位置: {box_rect}")
+            human_click(page, box_rect["x"] + box_rect["width"] / 2, box_rect["y"] + box_rect["height"] / 2)
+            return True
+        return False
+
+    def solve(self, page, instance, kind, success_selector=".timeline-item", stop_event=None):
+        """
+        尝试通过验证页面，返回是否成功。
+        速率限制页面无法通过点击解决，直接记为 skipped；
+        stop_event 被设置 (fan-out 已返回) 时尽快放弃，同样记为 skipped。
+        """
+        start = time.monotonic()
+        if kind == RATE_LIMITED:
+            logger.warning(f"实例 {instance} 提示速率限制，跳过验证处理")
+            metrics.record(instance, kind, "skipped", 0.0)
+            return False
+
+        deadline = start + self.budget
+        solved = False
+
+        def cancelled():
+            return stop_event is not None and stop_event.is_set()
+
+        try:
+            # JS 盾经常会自动通过，先短暂等待目标元素出现
+            solved = wait_for_selector(page, success_selector, min(random.randint(2000, 4000), self._remaining_ms(deadline)), stop_event)
+
+            attempt = 0
+            while not solved and not cancelled() and attempt < self.max_attempts and self._remaining_ms(deadline) > 0:
+                attempt += 1
+                logger.info(f"验证处理尝试 {attempt}/{self.max_attempts} ({instance})...")
+
+                clicked = False
+                try:
+                    clicked = self._click_frame(page) or self._click_shadow(page)
+                except Exception as e:
+                    logger.debug(f"验证框点击失败: {e}")
+
+                wait_ms = self._remaining_ms(deadline) if clicked else min(2000, self._remaining_ms(deadline))
+                if wait_ms <= 0:
+                    break
+                solved = wait_for_selector(page, success_selector, wait_ms, stop_event)
+                if not solved and clicked and not cancelled():
+                    logger.warning("点击验证框后未检测到成功跳转")
+        finally:
+            elapsed = time.monotonic() - start
+            outcome = "solved" if solved else ("skipped" if cancelled() else "failed")
+            metrics.record(instance, kind, outcome, elapsed)
+
+        if not solved and cancelled():
+            logger.info(f"收到停止信号，放弃验证处理 ({instance})")
+            return False
+
+        if solved:
+            logger.info(f"验证通过 ({instance})，耗时 {elapsed:.1f}s")
+        else:
+            logger.warning(f"验证未通过 ({instance})，耗时 {elapsed:.1f}s")
+        return solved
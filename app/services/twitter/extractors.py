@@ -0,0 +1,185 @@
+from bs4 import BeautifulSoup
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# 纯 HTML 的提取器：在线抓取与离线重解析 (archive) 共用同一套逻辑，不依赖浏览器
+
+def _parse(html):
+    soup = BeautifulSoup(html, "html.parser")
+    # inner_text 会把 <br> 渲染为换行，这里保持一致
+    for br in soup.find_all("br"):
+        br.replace_with("\n")
+    return soup
+
+def _text(container, selector, strip=True):
+    elem = container.select_one(selector)
+    if elem is None:
+        return None
+    text = elem.get_text()
+    return text.strip() if strip else text
+
+def _attr(container, selector, attr):
+    elem = container.select_one(selector)
+    return elem.get(attr) if elem is not None else None
+
+def _absolute(instance, url):
+    if url and url.startswith("/"):
+        return f"{instance}{url}"
+    return url
+
+def extract_nitter_author(soup, instance):
+    """从 Nitter 页面的 .profile-card 提取用户信息；页面没有 profile card 时返回空字典"""
+    author_info = {}
+
+    if soup.select_one(".profile-card") is None:
+        title = soup.title.get_text() if soup.title else ""
+        logger.warning(f"未找到 .profile-card 元素. 页面标题: {title}")
+        return author_info
+
+    # 1. 头像
+    avatar_href = _attr(soup, ".profile-card-avatar", "href")
+    if avatar_href:
+        author_info["avatar"] = _absolute(instance, avatar_href)
+
+    # 2-6. 名字、用户名、简介、位置、网站
+    author_info["name"] = _text(soup, ".profile-card-fullname")
+    author_info["username"] = _text(soup, ".profile-card-username")
+    author_info["bio"] = _text(soup, ".profile-bio")
+    author_info["location"] = _text(soup, ".profile-location")
+    author_info["website"] = _text(soup, ".profile-website")
+
+    # 7. 加入时间
+    author_info["joined"] = _attr(soup, ".profile-joindate", "title") or _text(soup, ".profile-joindate")
+
+    # 8. 统计数据 (清理 None 与千分位逗号)
+    stats = {
+        "posts": _text(soup, ".posts .profile-stat-num"),
+        "following": _text(soup, ".following .profile-stat-num"),
+        "followers": _text(soup, ".followers .profile-stat-num"),
+        "likes": _text(soup, ".likes .profile-stat-num"),
+    }
+    author_info["stats"] = {k: v.replace(",", "") if v else "0" for k, v in stats.items()}
+
+    # 9. Banner
+    banner_src = _attr(soup, ".profile-banner img", "src")
+    if banner_src:
+        author_info["banner"] = _absolute(instance, banner_src)
+
+    return author_info
+
+def extract_nitter_tweet(item, instance):
+    """提取单个 .timeline-item"""
+    tweet_data = {}
+
+    # 1. 内容
+    tweet_data["content"] = _text(item, ".tweet-content", strip=False) or ""
+
+    # 2. 发布时间
+    date_elem = item.select_one(".tweet-date a")
+    tweet_data["published_at"] = (date_elem.get("title") or "") if date_elem is not None else ""
+
+    # 3. 链接和 ID
+    if date_elem is not None and date_elem.get("href"):
+        href = date_elem.get("href")
+        tweet_data["url"] = f"{instance}{href}"
+        # 从 href 解析 ID: /user/status/123456#m
+        parts = href.split("/status/")
+        if len(parts) > 1:
+            tweet_data["id"] = parts[1].split("#")[0].split("?")[0]
+
+    # 4. 作者名称
+    tweet_data["author"] = _text(item, ".fullname", strip=False) or ""
+
+    # 5. 媒体资源：普通图片与视频/GIF 封面 (poster 属性)
+    media = []
+    for img in item.select(".attachment.image img"):
+        if img.get("src"):
+            media.append(_absolute(instance, img.get("src")))
+    for video in item.select(".attachment.video-container video"):
+        if video.get("poster"):
+            media.append(_absolute(instance, video.get("poster")))
+    tweet_data["media_urls"] = media
+
+    return tweet_data
+
+def extract_nitter(html, instance, limit=None, include_author=True):
+    """
+    解析 Nitter 时间线页面。
+
+    参数:
+        html: 页面 HTML
+        instance: 页面所在实例 (用于补全相对链接)
+        limit: 最多提取的推文数量，None 表示全部
+        include_author: 为 False 时跳过 .profile-card 的提取
+    """
+    soup = _parse(html)
+
+    author_info = {}
+    if include_author:
+        try:
+            author_info = extract_nitter_author(soup, instance)
+        except Exception as e:
+            logger.warning(f"提取用户信息出现异常: {e}")
+
+    items = soup.select(".timeline-item")
+    if limit is not None:
+        items = items[:limit]
+
+    return {
+        "author": author_info,
+        "tweet": [extract_nitter_tweet(item, instance) for item in items],
+    }
+
+def extract_sotwe(html, username, limit=None, include_author=True):
+    """解析 Sotwe 用户页面 (结构可能变化，这里基于常见结构尝试提取)"""
+    soup = _parse(html)
+    author_info = {}
+    results = []
+
+    # 作者信息：页面标题与 meta description
+    if include_author:
+        try:
+            title = soup.title.get_text() if soup.title else ""
+            author_info["name"] = title.split("|")[0].strip() if "|" in title else username
+            author_info["username"] = username
+
+            desc_meta = soup.select_one("meta[name='description']")
+            if desc_meta is not None:
+                author_info["description"] = desc_meta.get("content")
+        except Exception as e:
+            logger.warning(f"Sotwe 作者信息提取失败: {e}")
+
+    # 推文列表通常在 flex 容器中，选择器失效时退回更通用的选择器
+    tweet_elements = soup.select("div.flex.flex-col.gap-2 > div")
+    if not tweet_elements:
+        tweet_elements = soup.select("div.p-3")
+
+    for el in tweet_elements:
+        if limit is not None and len(results) >= limit:
+            break
+
+        text_el = el.select_one("div[dir='auto']") or el.select_one("p")
+        if text_el is None:
+            continue
+
+        date_el = el.select_one("time") or el.select_one("a[href*='/status/']")
+        date = date_el.get_text() if date_el is not None else ""
+
+        link = ""
+        link_el = el.select_one("a[href*='/status/']")
+        if link_el is not None and link_el.get("href"):
+            href = link_el.get("href")
+            link = f"https://twitter.com{href}" if href.startswith("/") else href
+
+        results.append({
+            "text": text_el.get_text(),
+            "created_at": date,
+            "link": link,
+            "is_retweet": False # Sotwe 较难区分，暂定 False
+        })
+
+    return {
+        "author": author_info,
+        "tweet": results
+    }
@@ -0,0 +1,82 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import get_settings
+from app.core.http import get_http_client
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# 反爬盾 (Cloudflare/DDOS-Guard) 常见的状态码，说明实例在线，只是需要浏览器过验证
+SHIELD_STATUSES = {403, 429, 503}
+
+_health = {}
+_health_lock = threading.Lock()
+
+def _record(instance, healthy, status=None, latency=None):
+    with _health_lock:
+        _health[instance] = {
+            "healthy": healthy,
+            "status": status,
+            "latency": latency,
+            "checked_at": time.time(),
+        }
+
+def probe_instance(instance, timeout=5):
+    """探测单个 Nitter 实例是否可达"""
+    start = time.monotonic()
+    try:
+        response = get_http_client().get(instance, timeout=timeout)
+        latency = time.monotonic() - start
+        healthy = response.status_code < 500 or response.status_code in SHIELD_STATUSES
+        _record(instance, healthy, response.status_code, latency)
+    except Exception as e:
+        logger.debug(f"实例 {instance} 探测失败: {e}")
+        _record(instance, False)
+    return _health[instance]
+
+def probe_instances(instances=None, timeout=5):
+    """并发探测所有配置的 Nitter 实例，返回 {instance: 状态}"""
+    if instances is None:
+        instances = get_settings().twitter.nitter_instances
+    if not instances:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(len(instances), 10), thread_name_prefix="nitter-probe") as executor:
+        list(executor.map(lambda i: probe_instance(i, timeout), instances))
+
+    healthy = sum(1 for i in instances if _health.get(i, {}).get("healthy"))
+    logger.info(f"Nitter 实例探测完成: {healthy}/{len(instances)} 可用")
+    return get_instance_health()
+
+def forget_instances(keep):
+    """删除不在 keep 中的实例状态 (实例列表热更新后调用)"""
+    keep = set(keep)
+    with _health_lock:
+        for instance in [i for i in _health if i not in keep]:
+            del _health[instance]
+
+def mark_instance(instance, healthy):
+    """根据实际抓取结果更新实例状态"""
+    _record(instance, healthy)
+
+def order_instances(instances):
+    """
+    按健康状态排序实例：可用实例 (按延迟升序) -> 未探测 -> 不可用。
+    同一类别内保持配置顺序。
+    """
+    def sort_key(item):
+        index, instance = item
+        state = _health.get(instance)
+        if state is None:
+            return (1, 0, index)
+        if state["healthy"]:
+            latency = state["latency"] if state["latency"] is not None else 0
+            return (0, latency, index)
+        return (2, 0, index)
+
+    return [instance for _, instance in sorted(enumerate(instances), key=sort_key)]
+
+def get_instance_health():
+    with _health_lock:
+        return {instance: dict(state) for instance, state in _health.items()}
@@ -1,49 +1,214 @@
-from app.core.config import get_config
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from app.core.config import get_config, get_settings
 from app.core.logger import setup_logger
 from app.services.twitter.nitter import scrape_nitter
 from app.services.twitter.sotwe import scrape_sotwe
+from app.services.twitter.normalize import normalize_result, merge_results
+from app.services.twitter.cache import ResultCache
+from app.services.twitter.media import process_media
+from app.services.twitter.stats import get_stats_history
 
 logger = setup_logger(__name__)
 
-def scrape_twitter_profile(username: str, limit: int = 10):
+SCRAPERS = {
+    "nitter": scrape_nitter,
+    "sotwe": scrape_sotwe,
+}
+
+_result_cache = None
+_author_cache = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache():
+    """获取进程内的抓取结果缓存"""
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                cache_config = get_config("scraper.twitter.cache", {}) or {}
+                _result_cache = ResultCache(
+                    ttl=cache_config.get("ttl", 60),
+                    max_entries=cache_config.get("max_entries", 512),
+                )
+    return _result_cache
+
+def get_author_cache():
+    """
+    获取用户信息缓存。用户信息 (头像、简介、加入时间等) 很少变化，
+    因此使用比推文更长的 TTL，命中时抓取可以跳过 .profile-card 的提取。
+    """
+    global _author_cache
+    if _author_cache is None:
+        with _result_cache_lock:
+            if _author_cache is None:
+                author_config = get_config("scraper.twitter.author_cache", {}) or {}
+                _author_cache = ResultCache(
+                    ttl=author_config.get("ttl", 3600),
+                    max_entries=author_config.get("max_entries", 4096),
+                )
+    return _author_cache
+
+def _is_full_profile(author):
+    """
+    是否为来自 Nitter profile card 的完整用户信息 (带统计数据)。
+    Sotwe 只能提供标题与简介，这类不完整的信息不写入用户信息缓存，也不记录统计。
+    """
+    return bool(author and author.get("stats"))
+
+def _load_profile(username: str, limit: int, include_author: bool):
+    author_key = username.lower()
+    cached_author = get_author_cache().get(author_key) if include_author else None
+
+    data = scrape_twitter_profile(username, limit, include_author=include_author and cached_author is None)
+
+    if not include_author:
+        data["author"] = {}
+    elif cached_author is not None:
+        data["author"] = dict(cached_author.value)
+    elif _is_full_profile(data.get("author")) and not data.get("error"):
+        get_author_cache().set(author_key, dict(data["author"]))
+        get_stats_history().record(username, data["author"].get("stats"))
+
+    return process_media(data)
+
+def get_twitter_profile(username: str, limit: int = 10, include_author: bool = True):
+    """
+    带缓存的抓取入口，返回 CacheEntry。
+    相同参数的并发请求只会触发一次实际抓取。
+    include_author 为 False 时不提取也不返回用户信息。
+    """
+    key = (username.lower(), limit, include_author)
+    return get_result_cache().get_or_load(
+        key,
+        lambda: _load_profile(username, limit, include_author),
+        cacheable=lambda data: not data.get("error"),
+        ttl=_result_ttl,
+    )
+
+def _result_ttl(data):
+    """媒体仍在后台下载时使用较短的 TTL，避免不完整的 media 记录在整个缓存周期内被返回"""
+    if data.get("media_pending"):
+        return get_config("scraper.twitter.media.pending_ttl", 5)
+    return None
+
+def scrape_twitter_profile(username: str, limit: int = 10, include_author: bool = True):
     """
     统一的 Twitter 抓取入口。
-    根据配置的 sources 优先级依次尝试抓取。
+    根据配置的 mode 选择调度方式:
+    - sequential: 按 sources 优先级依次尝试，返回第一个有数据的结果
+    - fanout: 并发请求所有 sources，按推文 ID 合并去重
     """
-    
+
     # 获取配置的源列表，默认为先 nitter 后 sotwe
-    sources = get_config("scraper.twitter.sources", ["nitter", "sotwe"])
-    
+    settings = get_settings().twitter
+    sources = settings.sources
+
+    if settings.mode == "fanout":
+        return scrape_twitter_fanout(username, limit, sources, include_author)
+
     last_exception = None
-    
+
     for source in sources:
         try:
             logger.info(f"Trying source: {source} for user {username}")
-            
-            data = None
-            if source == "nitter":
-                data = scrape_nitter(username, limit)
-            elif source == "sotwe":
-                data = scrape_sotwe(username, limit)
-            else:
+
+            scraper = SCRAPERS.get(source)
+            if scraper is None:
                 logger.warning(f"Unknown source: {source}")
                 continue
-                
+
+            data = scraper(username, limit, include_author=include_author)
+
             # 检查数据有效性
             if data and (data.get("tweet") or data.get("author")):
                 logger.info(f"Successfully scraped {len(data.get('tweet', []))} tweets from {source}")
+                data = normalize_result(data)
                 # 标记数据来源
                 data["source"] = source
                 return data
             else:
                 logger.warning(f"Source {source} returned empty data for {username}")
-                
+
         except Exception as e:
             logger.error(f"Error scraping from {source}: {e}")
             last_exception = e
-            
+
     # 如果所有源都失败
     logger.error(f"All sources failed for user {username}")
     if last_exception:
         raise last_exception
     return {"author": {}, "tweet": [], "error": "All sources failed"}
+
+def scrape_twitter_fanout(username: str, limit: int = 10, sources=None, include_author: bool = True):
+    """
+    并发请求所有数据源并合并结果。
+
+    合并时按 sources 顺序决定优先级 (靠前的数据源字段优先)。
+    当已收集到 limit 条不重复推文，或完成的数据源数量达到 quorum 时立即返回，
+    并通知其余仍在运行的数据源尽早停止。
+    """
+    settings = get_settings().twitter
+    if sources is None:
+        sources = settings.sources
+
+    unknown = set(sources) - set(SCRAPERS)
+    for source in unknown:
+        logger.warning(f"Unknown source: {source}")
+    sources = [s for s in sources if s in SCRAPERS]
+    if not sources:
+        return {"author": {}, "tweet": [], "error": "No valid sources configured"}
+
+    quorum = settings.fanout.quorum or len(sources)
+    quorum = max(1, min(quorum, len(sources)))
+    timeout = settings.fanout.timeout
+
+    stop_event = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="twitter-fanout")
+    futures = {
+        executor.submit(SCRAPERS[source], username, limit, stop_event=stop_event, include_author=include_author): source
+        for source in sources
+    }
+
+    results = {}
+    completed = 0
+    last_exception = None
+    merged = {"author": {}, "tweet": [], "sources": []}
+
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            source = futures[future]
+            completed += 1
+            try:
+                data = future.result()
+                if data and (data.get("tweet") or data.get("author")):
+                    results[source] = normalize_result(data)
+                    logger.info(f"Fan-out: {source} returned {len(data.get('tweet', []))} tweets for {username}")
+                else:
+                    logger.warning(f"Source {source} returned empty data for {username}")
+            except Exception as e:
+                logger.error(f"Error scraping from {source}: {e}")
+                last_exception = e
+
+            merged = merge_results(results, sources, limit)
+            if len(merged["tweet"]) >= limit:
+                logger.info(f"Fan-out: collected {limit} unique tweets, stopping remaining sources")
+                break
+            if completed >= quorum and results:
+                logger.info(f"Fan-out: quorum {completed}/{len(sources)} reached")
+                break
+    except FuturesTimeoutError:
+        logger.warning(f"Fan-out: timed out after {timeout}s with {completed}/{len(sources)} sources completed")
+    finally:
+        # 通知未完成的数据源停止，并且不等待它们结束
+        stop_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if merged["tweet"] or merged["author"]:
+        merged["source"] = ",".join(merged.pop("sources"))
+        return merged
+
+    logger.error(f"All sources failed for user {username}")
+    if last_exception:
+        raise last_exception
+    return {"author": {}, "tweet": [], "error": "All sources failed"}
@@ -0,0 +1,267 @@
+import os
+import json
+import base64
+import asyncio
+import hashlib
+import mimetypes
+import threading
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from urllib.parse import urlsplit, unquote
+from app.core.config import get_config
+from app.core.logger import setup_logger
+from app.core.user_agent import get_random_user_agent
+
+logger = setup_logger(__name__)
+
+TWIMG_HOST = "https://pbs.twimg.com/"
+
+def canonical_media_url(url):
+    """
+    将 Nitter 代理地址 (/pic/...) 还原为 pbs.twimg.com 上的原图地址。
+    不是 Nitter 图片代理的地址原样返回。
+
+    支持的形式:
+        /pic/media%2FXXX.jpg%3Fname%3Dsmall
+        /pic/orig/media%2FXXX.jpg
+        /pic/enc/<base64>  (实例开启了 base64Media)
+        /pic/profile_images%2F...%2FXXX_400x400.jpg
+    """
+    if not url:
+        return url
+    parts = urlsplit(url)
+    path = parts.path
+    if "/pic/" not in path:
+        return url
+
+    target = path.split("/pic/", 1)[1]
+    if parts.query:
+        target = f"{target}?{parts.query}"
+    if target.startswith("orig/"):
+        target = target[len("orig/"):]
+
+    if target.startswith("enc/"):
+        encoded = target[len("enc/"):]
+        try:
+            target = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)).decode("utf-8")
+        except (ValueError, UnicodeDecodeError):
+            logger.debug(f"无法解码媒体地址: {url}")
+            return url
+    else:
+        target = unquote(target)
+
+    # 去掉协议与域名，只保留 pbs.twimg.com 上的路径
+    for prefix in ("https://", "http://"):
+        if target.startswith(prefix):
+            target = target[len(prefix):]
+    host = target.split("/", 1)[0]
+    if host == "pbs.twimg.com":
+        target = target[len("pbs.twimg.com/"):]
+    elif host.endswith("twimg.com"):
+        # video.twimg.com 等其它域名不做改写
+        return url
+
+    path, _, _ = target.partition("?")
+    if path.startswith("media/"):
+        # 图片统一请求原图尺寸
+        return f"{TWIMG_HOST}{path}?name=orig"
+    if path.startswith("profile_images/"):
+        # 头像去掉尺寸后缀 (_normal / _400x400 等) 即为原图
+        stem, dot, ext = path.rpartition(".")
+        for suffix in ("_normal", "_bigger", "_mini", "_200x200", "_400x400"):
+            if stem.endswith(suffix):
+                stem = stem[: -len(suffix)]
+                break
+        return f"{TWIMG_HOST}{stem}{dot}{ext}"
+    return f"{TWIMG_HOST}{target}"
+
+class MediaStore:
+    """
+    按内容哈希存储的本地媒体库: <root>/<sha256[:2]>/<sha256[2:4]>/<sha256>.<ext>
+    index.jsonl 记录 URL -> 文件的映射，重复的 URL 不再下载，相同内容只保存一份。
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._index_path = os.path.join(root, "index.jsonl")
+        self._index = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if os.path.exists(os.path.join(self.root, record["path"])):
+                    self._index[record["url"]] = record
+
+    def lookup(self, url):
+        return self._index.get(url)
+
+    def put(self, url, content, content_type=None):
+        """保存内容并记录 URL 映射，返回记录"""
+        sha256 = hashlib.sha256(content).hexdigest()
+        ext = mimetypes.guess_extension(content_type or "") or os.path.splitext(urlsplit(url).path)[1] or ".bin"
+        if ext == ".jpe":
+            ext = ".jpg"
+        rel_path = os.path.join(sha256[:2], sha256[2:4], f"{sha256}{ext}")
+        full_path = os.path.join(self.root, rel_path)
+
+        if not os.path.exists(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            tmp_path = f"{full_path}.tmp{threading.get_ident()}"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, full_path)
+
+        record = {
+            "url": url,
+            "sha256": sha256,
+            "path": rel_path,
+            "content_type": content_type,
+            "size": len(content),
+        }
+        with self._lock:
+            self._index[url] = record
+            with open(self._index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        return record
+
+class MediaPipeline:
+    """
+    媒体下载管线：在独立的事件循环线程中使用带连接池的 httpx.AsyncClient，
+    以有限并发下载媒体文件并写入 MediaStore。
+    """
+
+    def __init__(self, store, concurrency=8, timeout=30):
+        self.store = store
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._pending = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="media-pipeline", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._init(), self._loop).result()
+
+    async def _init(self):
+        import httpx
+
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            headers={"User-Agent": get_random_user_agent()},
+            follow_redirects=True,
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def _fetch(self, url):
+        async with self._semaphore:
+            response = await self._client.get(url)
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "").split(";")[0] or None
+            content = response.content
+        return await asyncio.to_thread(self.store.put, url, content, content_type)
+
+    async def _download(self, url):
+        record = self.store.lookup(url)
+        if record is not None:
+            return record
+
+        # 同一 URL 的并发下载只执行一次
+        task = self._pending.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url))
+            self._pending[url] = task
+            task.add_done_callback(lambda _: self._pending.pop(url, None))
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            logger.warning(f"媒体下载失败 {url}: {e}")
+            return None
+
+    async def _download_all(self, urls):
+        records = await asyncio.gather(*(self._download(url) for url in urls))
+        return dict(zip(urls, records))
+
+    def download(self, urls, timeout=None):
+        """
+        下载一组 URL (可在任意线程调用)，返回 {url: 记录或 None}。
+        timeout 为最多等待的秒数；超时后下载在后台继续，结果中只包含已经在库中的 URL，
+        仍在下载的 URL 不出现在结果中。
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        future = asyncio.run_coroutine_threadsafe(self._download_all(urls), self._loop)
+        try:
+            return future.result(timeout)
+        except FuturesTimeoutError:
+            records = {url: self.store.lookup(url) for url in urls}
+            return {url: record for url, record in records.items() if record is not None}
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def get_media_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                media_config = get_config("scraper.twitter.media", {}) or {}
+                _pipeline = MediaPipeline(
+                    MediaStore(media_config.get("dir", "media")),
+                    concurrency=media_config.get("concurrency", 8),
+                    timeout=media_config.get("timeout", 30),
+                )
+    return _pipeline
+
+def close_media_pipeline():
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.close()
+            _pipeline = None
+
+def process_media(data):
+    """
+    对统一化后的抓取结果执行媒体管线 (需在配置中开启 scraper.twitter.media.enabled)：
+    改写代理地址为原图地址，并按配置下载到本地内容寻址存储。
+    """
+    media_config = get_config("scraper.twitter.media", {}) or {}
+    if not media_config.get("enabled", False):
+        return data
+
+    author = data.get("author") or {}
+    for key in ("avatar", "banner"):
+        if author.get(key):
+            author[key] = canonical_media_url(author[key])
+
+    tweets = data.get("tweet", [])
+    for tweet in tweets:
+        tweet["media_urls"] = [canonical_media_url(url) for url in tweet.get("media_urls", [])]
+
+    if not media_config.get("download", True):
+        return data
+
+    # 下载在后台管线中进行，抓取请求最多等待 inline_wait 秒
+    urls = [url for tweet in tweets for url in tweet["media_urls"]]
+    records = get_media_pipeline().download(urls, timeout=media_config.get("inline_wait", 2))
+    for tweet in tweets:
+        tweet["media"] = [dict(records[url]) for url in tweet["media_urls"] if records.get(url)]
+
+    # 仍在下载的文件数量；manager 据此为结果使用较短的缓存 TTL，之后的抓取可以拿到完整的 media 记录
+    pending = len(set(urls) - set(records))
+    if pending:
+        data["media_pending"] = pending
+    logger.info(f"媒体处理完成: {sum(1 for r in records.values() if r)}/{len(set(urls))} 个文件可用，{pending} 个仍在下载")
+    return data
@@ -0,0 +1,100 @@
+# 各数据源输出的统一化处理
+# Nitter 与 Sotwe 的字段命名不同 (content/published_at vs text/created_at)，
+# 这里统一转换为 app.models.tweet 中 Tweet / Author 的字段结构
+
+AUTHOR_FIELDS = ("name", "username", "avatar", "bio", "location", "website", "joined", "stats", "banner")
+
+
+def parse_tweet_id(url):
+    """从 .../status/123456#m 形式的链接中解析推文 ID"""
+    if not url or "/status/" not in url:
+        return None
+    tweet_id = url.split("/status/", 1)[1].split("#")[0].split("?")[0].split("/")[0]
+    return tweet_id or None
+
+
+def normalize_tweet(tweet):
+    """将单条推文转换为统一结构"""
+    data = {
+        "id": tweet.get("id"),
+        "url": tweet.get("url") or tweet.get("link") or None,
+        "content": tweet.get("content") if tweet.get("content") is not None else tweet.get("text", ""),
+        "published_at": tweet.get("published_at") if tweet.get("published_at") is not None else tweet.get("created_at", ""),
+        "author": tweet.get("author") or "",
+        "media_urls": list(tweet.get("media_urls") or []),
+        "media": list(tweet.get("media") or []),
+    }
+    if not data["id"]:
+        data["id"] = parse_tweet_id(data["url"])
+    return data
+
+
+def normalize_author(author):
+    """将作者信息转换为统一结构"""
+    if not author:
+        return {}
+    data = {key: author.get(key) for key in AUTHOR_FIELDS}
+    if not data["bio"] and author.get("description"):
+        data["bio"] = author.get("description")
+    return data
+
+
+def normalize_result(data):
+    """统一化一个数据源的完整抓取结果"""
+    return {
+        "author": normalize_author(data.get("author")),
+        "tweet": [normalize_tweet(t) for t in data.get("tweet", [])],
+    }
+
+
+def _tweet_key(tweet):
+    # 没有 ID 的推文退化为按链接或内容去重
+    return tweet.get("id") or tweet.get("url") or tweet.get("content")
+
+
+def merge_results(results, sources, limit=None):
+    """
+    按数据源优先级合并多个 (已统一化的) 抓取结果。
+
+    results: {source: normalize_result(...)}
+    sources: 优先级顺序，靠前的数据源字段优先；靠后的数据源只补充空缺字段
+    limit: 最多保留的推文数量
+    """
+    author = {}
+    merged = {}
+    order = []
+    used_sources = []
+
+    for source in sources:
+        data = results.get(source)
+        if not data:
+            continue
+        if data.get("tweet") or data.get("author"):
+            used_sources.append(source)
+
+        for key, value in (data.get("author") or {}).items():
+            if value and not author.get(key):
+                author[key] = value
+
+        for tweet in data.get("tweet", []):
+            key = _tweet_key(tweet)
+            if not key:
+                continue
+            if key not in merged:
+                merged[key] = dict(tweet)
+                order.append(key)
+                continue
+            existing = merged[key]
+            for field, value in tweet.items():
+                if value and not existing.get(field):
+                    existing[field] = value
+
+    tweets = [merged[key] for key in order]
+    if limit is not None:
+        tweets = tweets[:limit]
+
+    return {
+        "author": author,
+        "tweet": tweets,
+        "sources": used_sources,
+    }
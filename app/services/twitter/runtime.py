@@ -0,0 +1,143 @@
+import time
+import threading
+from app.core.config import get_config, get_settings
+from app.core.http import get_http_client, close_http_client
+from app.core.logger import setup_logger, set_log_level
+from app.services.twitter.browser import get_browser_pool, close_browser_pool
+from app.services.twitter.health import probe_instances, forget_instances, get_instance_health
+from app.services.twitter.media import close_media_pipeline
+from app.services.twitter.archive import close_archive_writer
+from app.services.twitter.watchdog import close_browser_watchdog
+
+logger = setup_logger(__name__)
+
+_state = {
+    "warmed": False,
+    "warming": False,
+    "started_at": None,
+    "finished_at": None,
+    "error": None,
+}
+_state_lock = threading.Lock()
+
+def prewarm():
+    """
+    预热抓取运行时：启动浏览器池 (含已应用 stealth 的空闲上下文)、
+    初始化共享 HTTP 客户端，并探测 Nitter 实例的可用性。
+    """
+    with _state_lock:
+        if _state["warmed"] or _state["warming"]:
+            return
+        _state.update(warming=True, started_at=time.time(), error=None)
+
+    logger.info("开始预热抓取运行时...")
+    try:
+        get_http_client()
+
+        pool = get_browser_pool()
+        pool.start(wait=False)
+
+        # 浏览器启动期间并行探测实例
+        timeout = get_config("scraper.twitter.health.timeout", 5)
+        probe_instances(timeout=timeout)
+
+        pool.start(wait=True, timeout=get_settings().twitter.browser.startup_timeout)
+        if not pool.ready:
+            raise RuntimeError(f"浏览器池未能全部启动: {pool.stats()}")
+
+        with _state_lock:
+            _state["warmed"] = True
+        logger.info(f"抓取运行时预热完成，耗时 {time.time() - _state['started_at']:.1f}s")
+    except Exception as e:
+        logger.error(f"抓取运行时预热失败: {e}")
+        with _state_lock:
+            _state["error"] = str(e)
+    finally:
+        with _state_lock:
+            _state.update(warming=False, finished_at=time.time())
+
+def shutdown():
+    """释放浏览器、HTTP 连接、媒体下载管线与页面归档"""
+    with _state_lock:
+        _state.update(warmed=False, finished_at=None)
+    close_browser_watchdog()
+    close_browser_pool()
+    close_media_pipeline()
+    close_archive_writer()
+    close_http_client()
+
+def readiness():
+    """返回就绪状态，供 /ready 使用"""
+    instances = get_instance_health()
+    with _state_lock:
+        state = dict(_state)
+    pool = get_browser_pool()
+    if get_settings().twitter.browser.prewarm:
+        # 预热结束 (无论成功与否) 后，就绪状态由浏览器池当前的可用 worker 决定：
+        # 失败的 worker 重新启动后恢复就绪，浏览器全部崩溃后变为未就绪
+        ready = state["finished_at"] is not None and pool.live_workers > 0
+    else:
+        # 未开启预热时浏览器按需启动，只有全部 worker 都已失败时才视为未就绪
+        ready = pool.available
+    return {
+        "ready": ready,
+        "warmed": state["warmed"],
+        "warming": state["warming"],
+        "error": state["error"],
+        "browser_pool": pool.stats(),
+        "healthy_instances": sum(1 for s in instances.values() if s["healthy"]),
+        "probed_instances": len(instances),
+    }
+
+def apply_config(old, new):
+    """
+    配置热加载回调：把变化应用到运行中的组件，无需重启进程。
+    - 浏览器池大小 / headless
+    - 结果缓存与用户信息缓存的 TTL、容量
+    - Nitter 实例列表 (重新探测新增实例)
+    - 日志级别
+    User-Agent、超时、数据源、fanout 参数等在每次抓取时从快照读取，自动生效。
+    """
+    # 延迟导入，避免与 manager 的循环依赖
+    from app.services.twitter.manager import get_result_cache, get_author_cache
+
+    if old is None:
+        return
+    old_paths, new_paths = old.paths, new.paths
+
+    def changed(path):
+        return old_paths.get(path) != new_paths.get(path)
+
+    old_browser, new_browser = old.twitter.browser, new.twitter.browser
+    pool = get_browser_pool()
+    if old_browser.headless != new_browser.headless:
+        pool.size = new_browser.pool_size
+        pool.restart(headless=new_browser.headless)
+    elif old_browser.pool_size != new_browser.pool_size:
+        pool.resize(new_browser.pool_size)
+
+    for cache, prefix, defaults in (
+        (get_result_cache(), "scraper.twitter.cache", (60, 512)),
+        (get_author_cache(), "scraper.twitter.author_cache", (3600, 4096)),
+    ):
+        if changed(f"{prefix}.ttl") or changed(f"{prefix}.max_entries"):
+            cache.ttl = new_paths.get(f"{prefix}.ttl", defaults[0])
+            cache.max_entries = new_paths.get(f"{prefix}.max_entries", defaults[1])
+            logger.info(f"{prefix} 已更新: ttl={cache.ttl}, max_entries={cache.max_entries}")
+
+    if old.twitter.nitter_instances != new.twitter.nitter_instances:
+        instances = new.twitter.nitter_instances
+        forget_instances(instances)
+        added = [i for i in instances if i not in old.twitter.nitter_instances]
+        logger.info(f"Nitter 实例列表已更新: {len(instances)} 个实例，新增 {len(added)} 个")
+        if added:
+            # 探测在后台进行，不阻塞配置监听线程
+            threading.Thread(
+                target=probe_instances,
+                kwargs={"instances": added, "timeout": new_paths.get("scraper.twitter.health.timeout", 5)},
+                name="nitter-probe-reload",
+                daemon=True,
+            ).start()
+
+    if changed("log.level"):
+        set_log_level(new_paths.get("log.level", "INFO"))
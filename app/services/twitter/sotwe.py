@@ -1,44 +1,45 @@
-from playwright.sync_api import sync_playwright
-from playwright_stealth import Stealth
+from app.services.twitter.browser import get_browser_pool
+from app.services.twitter.extractors import extract_sotwe
+from app.services.twitter.archive import capture_page
 from app.core.logger import setup_logger
-from app.core.config import get_config
-from app.core.user_agent import get_random_user_agent
-import time
+from app.core.config import get_settings
 
 logger = setup_logger(__name__)
 
-def scrape_sotwe(username, limit=10):
+def scrape_sotwe(username, limit=10, stop_event=None, include_author=True):
     """
     通过 Sotwe.com 抓取推文 (作为 Nitter 的备选)
+
+    stop_event: 可选的 threading.Event，被设置后跳过抓取 (用于并发 fan-out)
+    include_author: 为 False 时跳过用户信息的提取
     """
+    if stop_event is not None and stop_event.is_set():
+        return {"author": {}, "tweet": []}
+
     url = f"https://www.sotwe.com/{username}"
     logger.info(f"正在通过 Sotwe 抓取用户: {username}")
 
-    # 从配置获取浏览器选项
-    browser_config = get_config("scraper.twitter.browser", {})
-    headless = browser_config.get("headless", True)
-    timeout = browser_config.get("timeout", 20000)
-    
-    user_agent = get_random_user_agent()
-    logger.info(f"Using User-Agent: {user_agent}")
+    # 从当前配置快照获取浏览器选项
+    browser_settings = get_settings().twitter.browser
+    timeout = browser_settings.timeout
+
+    # 在浏览器池的 worker 线程中执行抓取
+    return get_browser_pool().run(
+        lambda worker: _scrape_sotwe_with_worker(worker, username, limit, url, timeout, include_author, stop_event),
+        timeout=browser_settings.job_timeout,
+    )
 
+def _scrape_sotwe_with_worker(worker, username, limit, url, timeout, include_author, stop_event=None):
     results = []
     author_info = {}
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=headless,
-            args=['--disable-blink-features=AutomationControlled']
-        )
-        context = browser.new_context(
-            user_agent=user_agent,
-            viewport={"width": 1920, "height": 1080},
-            locale="en-US"
-        )
-        
-        stealth = Stealth()
-        stealth.apply_stealth_sync(context)
-        
+    # 任务可能在队列中等待了一段时间，期间 fan-out 已经返回
+    if stop_event is not None and stop_event.is_set():
+        logger.info("收到停止信号，跳过 Sotwe 抓取")
+        return {"author": author_info, "tweet": results}
+
+    context = worker.acquire_context()
+    try:
         page = context.new_page()
         
         try:
@@ -50,78 +51,27 @@ def scrape_sotwe(username, limit=10):
 
             # 等待内容加载
             page.wait_for_timeout(2000)
-            
-            # Sotwe 的结构可能变化，这里基于常见结构尝试提取
-            # 通常推文在特定的容器中
-            
-            # 尝试提取作者信息
-            try:
-                # 这是一个通用的尝试，具体选择器可能需要根据实际页面调整
-                # 假设页面标题或 meta 标签包含信息
-                title = page.title()
-                author_info["name"] = title.split("|")[0].strip() if "|" in title else username
-                author_info["username"] = username
-                
-                # 尝试从 meta description 获取简介
-                desc_meta = page.query_selector("meta[name='description']")
-                if desc_meta:
-                    author_info["description"] = desc_meta.get_attribute("content")
-            except Exception as e:
-                logger.warning(f"Sotwe 作者信息提取失败: {e}")
-
-            # 提取推文
-            # Sotwe 推文列表通常在某个 flex 容器中
-            # 查找所有可能的推文容器
-            # 这里使用比较宽泛的选择器，然后过滤
+            if stop_event is not None and stop_event.is_set():
+                logger.info("收到停止信号，停止 Sotwe 抓取")
+                return {"author": {}, "tweet": []}
             
             # 滚动几次以加载更多
             for _ in range(2):
                 page.mouse.wheel(0, 1000)
                 page.wait_for_timeout(500)
 
-            tweet_elements = page.query_selector_all("div.flex.flex-col.gap-2 > div") 
-            # 如果上面的选择器失效，尝试更通用的
-            if not tweet_elements:
-                 tweet_elements = page.query_selector_all("div.p-3")
-
-            count = 0
-            for el in tweet_elements:
-                if count >= limit:
-                    break
-                    
-                try:
-                    text_el = el.query_selector("div[dir='auto']") or el.query_selector("p")
-                    if not text_el:
-                        continue
-                        
-                    text = text_el.inner_text()
-                    
-                    # 尝试提取时间
-                    date_el = el.query_selector("time") or el.query_selector("a[href*='/status/']")
-                    date = date_el.inner_text() if date_el else ""
-                    
-                    # 尝试提取链接
-                    link = ""
-                    link_el = el.query_selector("a[href*='/status/']")
-                    if link_el:
-                        href = link_el.get_attribute("href")
-                        if href:
-                             link = f"https://twitter.com{href}" if href.startswith("/") else href
+            # 一次性取出页面 HTML，后续解析不再与浏览器交互
+            html = page.content()
+            capture_page("sotwe", "https://www.sotwe.com", url, username, html)
 
-                    results.append({
-                        "text": text,
-                        "created_at": date,
-                        "link": link,
-                        "is_retweet": False # Sotwe 较难区分，暂定 False
-                    })
-                    count += 1
-                except Exception as e:
-                    continue
+            extracted = extract_sotwe(html, username, limit, include_author)
+            author_info = extracted["author"]
+            results = extracted["tweet"]
 
         except Exception as e:
             logger.error(f"Sotwe 抓取异常: {e}")
-        finally:
-            browser.close()
+    finally:
+        worker.release_context(context)
 
     return {
         "author": author_info,
@@ -0,0 +1,85 @@
+import time
+import threading
+from array import array
+from app.core.config import get_config
+
+STAT_FIELDS = ("posts", "following", "followers", "likes")
+# 每个数据点: 时间戳 + 各项统计
+_POINT_SIZE = 1 + len(STAT_FIELDS)
+
+def _to_int(value):
+    try:
+        return int(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return -1
+
+class StatsHistory:
+    """
+    按用户记录关注/粉丝等统计数据的时间序列。
+    每个用户的数据点平铺存放在一个 array('q') 中，相邻重复的数据点只更新时间戳。
+    """
+
+    def __init__(self, max_points=1000, max_users=10000):
+        self.max_points = max_points
+        self.max_users = max_users
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, username, stats, timestamp=None):
+        if not stats:
+            return
+        values = [_to_int(stats.get(field)) for field in STAT_FIELDS]
+        if all(v < 0 for v in values):
+            return
+        timestamp = int(timestamp if timestamp is not None else time.time())
+        key = username.lower()
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                if len(self._series) >= self.max_users:
+                    # 淘汰最早加入的用户
+                    self._series.pop(next(iter(self._series)))
+                series = self._series[key] = array("q")
+
+            # 与上一个数据点相同时，只记录最新的观测时间
+            if len(series) >= _POINT_SIZE and list(series[-len(STAT_FIELDS):]) == values:
+                series[-_POINT_SIZE] = timestamp
+                return
+
+            series.append(timestamp)
+            series.extend(values)
+            overflow = len(series) // _POINT_SIZE - self.max_points
+            if overflow > 0:
+                del series[:overflow * _POINT_SIZE]
+
+    def query(self, username, since=None):
+        """返回 [{"timestamp": ..., "posts": ..., ...}]，按时间升序"""
+        with self._lock:
+            series = self._series.get(username.lower())
+            data = series.tolist() if series is not None else []
+
+        points = []
+        for i in range(0, len(data), _POINT_SIZE):
+            if since is not None and data[i] < since:
+                continue
+            point = {"timestamp": data[i]}
+            for offset, field in enumerate(STAT_FIELDS, start=1):
+                point[field] = data[i + offset] if data[i + offset] >= 0 else None
+            points.append(point)
+        return points
+
+_history = None
+_history_lock = threading.Lock()
+
+def get_stats_history():
+    global _history
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                history_config = get_config("scraper.twitter.stats_history", {}) or {}
+                _history = StatsHistory(
+                    max_points=history_config.get("max_points", 1000),
+                    max_users=history_config.get("max_users", 10000),
+                )
+    return _history
@@ -1,14 +1,13 @@
 import random
-import time
-import math
 
 def human_mouse_move(page, start_x, start_y, end_x, end_y, steps=20):
     """
     模拟人类鼠标移动轨迹 (Bézier 曲线)
+    等待使用 page.wait_for_timeout，不会用 time.sleep 阻塞线程
     """
     # 随机控制点
-    control_x = random.randint(min(start_x, end_x), max(start_x, end_x))
-    control_y = random.randint(min(start_y, end_y), max(start_y, end_y))
+    control_x = random.randint(int(min(start_x, end_x)), int(max(start_x, end_x)))
+    control_y = random.randint(int(min(start_y, end_y)), int(max(start_y, end_y)))
     
     for i in range(steps + 1):
         t = i / steps
@@ -22,7 +21,7 @@ def human_mouse_move(page, start_x, start_y, end_x, end_y, steps=20):
         
         page.mouse.move(x, y)
         # 随机等待
-        time.sleep(random.uniform(0.005, 0.02))
+        page.wait_for_timeout(random.randint(5, 20))
 
 def human_click(page, x, y):
     """
@@ -35,7 +34,25 @@ def human_click(page, x, y):
     start_y = random.randint(0, 1080)
     
     human_mouse_move(page, start_x, start_y, x, y)
-    time.sleep(random.uniform(0.1, 0.3))
+    page.wait_for_timeout(random.randint(100, 300))
     page.mouse.down()
-    time.sleep(random.uniform(0.05, 0.15))
+    page.wait_for_timeout(random.randint(50, 150))
     page.mouse.up()
+
+def wait_for_selector(page, selector, timeout, stop_event=None, step=1000):
+    """
+    等待元素出现。传入 stop_event 时分段等待，每段之间检查停止信号，
+    以便被取消的抓取尽快释放浏览器。
+    找到元素返回 True，超时或收到停止信号返回 False。
+    """
+    remaining = timeout
+    while remaining > 0:
+        if stop_event is not None and stop_event.is_set():
+            return False
+        wait_ms = remaining if stop_event is None else min(step, remaining)
+        try:
+            page.wait_for_selector(selector, timeout=wait_ms)
+            return True
+        except Exception:
+            remaining -= wait_ms
+    return False
@@ -0,0 +1,214 @@
+import os
+import time
+import threading
+from app.core.config import get_config
+from app.core.logger import setup_logger
+from app.services.twitter.browser import get_browser_pool
+
+logger = setup_logger(__name__)
+
+_MB = 1024 * 1024
+
+def _load_psutil():
+    # psutil 为可选依赖，未安装时只统计上下文/页面数量，不统计内存
+    try:
+        import psutil
+        return psutil
+    except ImportError:
+        return None
+
+def _tree_rss(psutil, pid):
+    """返回 (进程树 RSS 字节数, 最大的单个子进程 RSS, 进程数)；进程不存在时返回 None"""
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return None
+
+    total = largest = count = 0
+    for process in processes:
+        try:
+            rss = process.memory_info().rss
+        except psutil.Error:
+            continue
+        total += rss
+        count += 1
+        if process is not root:
+            largest = max(largest, rss)
+    return total, largest, count
+
+class BrowserWatchdog:
+    """
+    浏览器资源看门狗：定期采样每个 worker 的浏览器进程树内存 (含渲染进程)
+    与打开的上下文/页面数量，超过阈值时回收该 worker。
+
+    回收通过 BrowserPool.recycle 完成：新浏览器立即启动，旧浏览器完成正在执行的抓取后才关闭。
+    阈值每次采样时从配置读取，支持热加载。
+    """
+
+    def __init__(self, pool=None, interval=None):
+        self._pool = pool
+        self._interval = interval
+        self._psutil = _load_psutil()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._recycles = {}
+        self._process_rss = None
+        self._last_run = None
+
+    @property
+    def pool(self):
+        return self._pool or get_browser_pool()
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        if self._psutil is None:
+            logger.warning("未安装 psutil，浏览器 watchdog 不统计内存占用")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="browser-watchdog", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self._interval or get_config("scraper.twitter.browser.watchdog.interval", 10)):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"浏览器 watchdog 采样失败: {e}")
+
+    def sample(self, worker):
+        """采样单个 worker 的资源占用 (只读取计数与进程信息，不调用 Playwright)"""
+        sample = {
+            "pid": worker.pid,
+            "jobs_done": worker.jobs_done,
+            "open_contexts": worker.open_contexts,
+            "open_pages": worker.open_pages,
+            "leaked_contexts": worker.leaked_contexts,
+            "age": round(time.monotonic() - worker.started_at, 1) if worker.started_at else None,
+            "connected": worker.connected,
+            "rss_mb": None,
+            "max_renderer_rss_mb": None,
+            "processes": None,
+        }
+        if self._psutil is not None and worker.pid:
+            tree = _tree_rss(self._psutil, worker.pid)
+            if tree is not None:
+                total, largest, count = tree
+                sample.update(
+                    rss_mb=round(total / _MB, 1),
+                    max_renderer_rss_mb=round(largest / _MB, 1),
+                    processes=count,
+                )
+        return sample
+
+    def _dead(self, worker):
+        """浏览器已断开或进程已不存在时返回原因"""
+        if not worker.connected:
+            return "browser disconnected"
+        if self._psutil is not None and worker.pid and not self._psutil.pid_exists(worker.pid):
+            return "browser process exited"
+        return None
+
+    def _count_recycle(self, kind):
+        with self._lock:
+            self._recycles[kind] = self._recycles.get(kind, 0) + 1
+
+    def _exceeded(self, sample):
+        """返回超出的阈值描述，未超出时返回 None"""
+        limits = get_config("scraper.twitter.browser.watchdog", {}) or {}
+        checks = (
+            ("rss_mb", "max_rss_mb"),
+            ("max_renderer_rss_mb", "max_renderer_rss_mb"),
+            ("open_pages", "max_pages"),
+            ("open_contexts", "max_contexts"),
+            ("jobs_done", "max_jobs"),
+            ("age", "max_age"),
+        )
+        for field, limit_key in checks:
+            limit = limits.get(limit_key)
+            if limit and sample[field] is not None and sample[field] > limit:
+                return f"{field}={sample[field]} > {limit_key}={limit}"
+        return None
+
+    def check(self):
+        """对当前所有 worker 采样一次，必要时回收"""
+        pool = self.pool
+        samples = {}
+        for worker in pool.workers():
+            if worker.retiring or not worker.ready.is_set():
+                continue
+            if worker.error is not None:
+                # 启动或运行失败的 worker：退避时间到了之后替换 (与浏览器池自身的重启互为兜底)
+                if pool.respawn(worker):
+                    self._count_recycle("failed")
+                continue
+
+            sample = self.sample(worker)
+            dead = self._dead(worker)
+            if dead is not None:
+                logger.warning(f"Browser worker {worker.index} {dead}，开始回收")
+                if pool.recycle(worker, dead):
+                    sample["recycled"] = dead
+                    self._count_recycle(dead.replace(" ", "_"))
+                samples[worker.index] = sample
+                continue
+
+            reason = self._exceeded(sample)
+            if reason is not None:
+                logger.warning(f"Browser worker {worker.index} 超出资源阈值 ({reason})，开始回收")
+                if pool.recycle(worker, reason):
+                    sample["recycled"] = reason
+                    self._count_recycle(reason.split("=", 1)[0])
+            samples[worker.index] = sample
+
+        process_rss = None
+        if self._psutil is not None:
+            try:
+                process_rss = round(self._psutil.Process(os.getpid()).memory_info().rss / _MB, 1)
+            except self._psutil.Error:
+                pass
+
+        with self._lock:
+            self._samples = samples
+            self._process_rss = process_rss
+            self._last_run = time.time()
+        return samples
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "memory_sampling": self._psutil is not None,
+                "last_run": self._last_run,
+                "process_rss_mb": self._process_rss,
+                "total_browser_rss_mb": round(sum(s["rss_mb"] or 0 for s in self._samples.values()), 1),
+                "workers": {index: dict(sample) for index, sample in self._samples.items()},
+                "recycles": dict(self._recycles),
+            }
+
+_watchdog = None
+_watchdog_lock = threading.Lock()
+
+def get_browser_watchdog():
+    global _watchdog
+    if _watchdog is None:
+        with _watchdog_lock:
+            if _watchdog is None:
+                _watchdog = BrowserWatchdog()
+    return _watchdog
+
+def close_browser_watchdog():
+    global _watchdog
+    with _watchdog_lock:
+        if _watchdog is not None:
+            _watchdog.stop()
+            _watchdog = None
@@ -0,0 +1,91 @@
+"""
+响应序列化微基准 (limit=100)。
+
+对比:
+  - validate + jsonable_encoder + json.dumps: 经过 response_model 校验的传统路径
+  - validate + model_dump_json: Pydantic v2 直接输出 JSON
+  - orjson (cache miss): 跳过校验，直接 orjson 编码已统一化的数据
+  - cached bytes (cache hit): 直接返回缓存条目上已编码的 bytes
+
+用法: python benchmarks/bench_serialization.py [--limit 100] [--number 2000]
+"""
+import os
+import sys
+import json
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from app.api.endpoints.twitter import build_payload, encode_entry
+from app.models.tweet import TwitterResponse
+from app.services.twitter.cache import CacheEntry
+
+def make_data(limit):
+    author = {
+        "name": "NASA",
+        "username": "@NASA",
+        "avatar": "https://nitter.example/pic/profile_images%2F1321163587679784960%2F0ZxKlEKB_400x400.jpg",
+        "bio": "There's space for everybody. ✨",
+        "location": "Pale Blue Dot",
+        "website": "nasa.gov",
+        "joined": "10:59 AM - 20 Dec 2007",
+        "stats": {"posts": "72000", "following": "180", "followers": "88000000", "likes": "16000"},
+        "banner": "https://nitter.example/pic/profile_banners%2F11348282%2F1700000000%2F1500x500",
+    }
+    tweets = []
+    for i in range(limit):
+        tweet_id = str(1790000000000000000 + i)
+        tweets.append({
+            "id": tweet_id,
+            "url": f"https://nitter.example/NASA/status/{tweet_id}#m",
+            "content": "Our Artemis II crew is ready for launch. Watch live coverage starting at 6am ET. " * 3,
+            "published_at": "May 13, 2024 · 4:12 PM UTC",
+            "author": "NASA",
+            "media_urls": [f"https://nitter.example/pic/media%2FGNabc{i}XcAA.jpg%3Fname%3Dsmall"],
+        })
+    return {"author": author, "tweet": tweets}
+
+def main():
+    parser = argparse.ArgumentParser(description="响应序列化微基准")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    data = make_data(args.limit)
+    payload = build_payload(data)
+
+    def validated_json():
+        model = TwitterResponse.model_validate(payload)
+        return json.dumps(jsonable_encoder(model), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def validated_dump_json():
+        return TwitterResponse.model_validate(payload).model_dump_json().encode("utf-8")
+
+    def orjson_miss():
+        return encode_entry(CacheEntry(data, 60))
+
+    hot_entry = CacheEntry(data, 60)
+    encode_entry(hot_entry)
+
+    def cached_bytes():
+        return encode_entry(hot_entry)
+
+    cases = [
+        ("validate + jsonable_encoder + json.dumps", validated_json),
+        ("validate + model_dump_json", validated_dump_json),
+        ("orjson (cache miss)", orjson_miss),
+        ("cached bytes (cache hit)", cached_bytes),
+    ]
+
+    print(f"limit={args.limit}, number={args.number}, payload={len(orjson_miss())} bytes")
+    baseline = None
+    for name, fn in cases:
+        per_call = min(timeit.repeat(fn, number=args.number, repeat=3)) / args.number
+        if baseline is None:
+            baseline = per_call
+        print(f"{name:<42} {per_call * 1e6:10.1f} us/req  ({baseline / per_call:6.1f}x)")
+
+if __name__ == "__main__":
+    main()
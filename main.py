@@ -12,9 +12,11 @@ def main():
     default_host = get_config("server.host", "127.0.0.1")
     default_port = get_config("server.port", 8000)
     default_reload = get_config("server.reload", False)
+    default_workers = get_config("server.workers", 1)
 
     parser.add_argument("--host", default=default_host, help=f"监听主机 (默认: {default_host})")
     parser.add_argument("--port", type=int, default=default_port, help=f"监听端口 (默认: {default_port})")
+    parser.add_argument("--workers", type=int, default=default_workers, help=f"worker 进程数，大于 1 时启用按用户名分发的多进程模式 (默认: {default_workers})")
     
     if default_reload:
         parser.add_argument("--no-reload", action="store_false", dest="reload", help="禁用热重载")
@@ -25,6 +27,17 @@ def main():
     # 解析参数
     args = parser.parse_args()
     
+    if args.workers > 1:
+        # 多进程模式：前置分发器监听对外端口，worker 进程监听本地端口
+        from app.dispatcher import create_dispatcher_app
+
+        base_port = get_config("server.dispatcher.base_port", args.port + 100)
+        logger.info(f"启动分发器在 http://{args.host}:{args.port}，{args.workers} 个 worker 端口 {base_port}-{base_port + args.workers - 1}")
+        if args.reload:
+            logger.warning("多进程模式不支持热重载，已忽略 --reload")
+        uvicorn.run(create_dispatcher_app(args.workers, "127.0.0.1", base_port), host=args.host, port=args.port)
+        return
+
     logger.info(f"启动 API 服务在 http://{args.host}:{args.port}")
     # 注意这里引用的 app 路径变了
     uvicorn.run("app.main:app", host=args.host, port=args.port, reload=args.reload)
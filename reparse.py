@@ -0,0 +1,37 @@
+import sys
+import json
+import argparse
+from app.core.logger import setup_logger
+from app.core.config import get_config
+from app.services.twitter.archive import reparse_archive
+
+logger = setup_logger("reparse")
+
+def main():
+    parser = argparse.ArgumentParser(description="离线重解析归档的页面 HTML (不需要网络与浏览器)")
+
+    default_dir = get_config("scraper.twitter.archive.dir", "archive")
+
+    parser.add_argument("--archive", default=default_dir, help=f"归档目录 (默认: {default_dir})")
+    parser.add_argument("--output", default="-", help="输出 JSONL 文件，- 表示标准输出 (默认: -)")
+    parser.add_argument("--workers", type=int, default=None, help="解析进程数 (默认: CPU 核数)")
+
+    args = parser.parse_args()
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    count = 0
+    errors = 0
+    try:
+        for result in reparse_archive(args.archive, workers=args.workers):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            count += 1
+            if result.get("error"):
+                errors += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    logger.info(f"重解析完成: {count} 条记录，{errors} 条解析失败")
+
+if __name__ == "__main__":
+    main()